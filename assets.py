@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import arcade
+
+SOUND_EXTENSIONS = (".wav", ".ogg", ".mp3")
+
+# Всё, что нужно игре и экрану финиша; грузится в фоне, пока открыто меню
+PRELOAD = (
+    "images/player.png",
+    "images/ball.png",
+    "images/bg.jpeg",
+    "images/cup_gold.png",
+    "images/cup_silver.png",
+    "images/cup_bronze.png",
+    "sounds/armed.wav",
+    "sounds/armed_loop.wav",
+    "sounds/fly.wav",
+    "sounds/bounce.wav",
+)
+
+
+def load(path: str):
+    if path.endswith(SOUND_EXTENSIONS):
+        return arcade.load_sound(path)
+    return arcade.load_texture(path)
+
+
+class AssetManager:
+    # Общий кэш текстур и звуков. Кто пользуется ресурсом, берёт его через acquire
+    # и отдаёт через release; ресурсы без ссылок остаются в кэше, пока их не
+    # больше capacity, а потом выбрасываются самые давно нужные.
+    # Загрузка идёт в фоновом потоке: картинки и звук там только декодируются,
+    # в видеокарту текстура попадает при первой отрисовке в главном потоке
+    def __init__(self, capacity: int = 16):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # путь -> [Future, число ссылок]
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assets")
+
+    def entry(self, path: str) -> list:
+        entry = self.entries.get(path)
+        if entry is None:
+            entry = self.entries[path] = [self.executor.submit(load, path), 0]
+            self.evict()
+        else:
+            self.entries.move_to_end(path)
+        return entry
+
+    def evict(self) -> None:
+        unused = [path for path, (future, refs) in self.entries.items() if not refs and future.done()]
+        for path in unused[:max(len(self.entries) - self.capacity, 0)]:
+            del self.entries[path]
+
+    # Поставить в очередь фоновой загрузки, ссылок не берёт
+    def preload(self, paths) -> None:
+        with self.lock:
+            for path in paths:
+                self.entry(path)
+
+    # Сколько из paths уже загружено (с ошибкой тоже считается) — для экрана загрузки
+    def progress(self, paths) -> tuple:
+        with self.lock:
+            done = sum(1 for path in paths if path in self.entries and self.entries[path][0].done())
+        return done, len(paths)
+
+    # Ждёт, только если ресурс ещё не догрузился
+    def acquire(self, path: str):
+        with self.lock:
+            entry = self.entry(path)
+            entry[1] += 1
+        try:
+            return entry[0].result()
+        except Exception:
+            # Битый или отсутствующий файл не должен оседать в кэше
+            with self.lock:
+                if self.entries.get(path) is entry:
+                    del self.entries[path]
+            raise
+
+    def release(self, path: str) -> None:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[1] > 0:
+                entry[1] -= 1
+            self.evict()
+
+
+assets = AssetManager()
@@ -0,0 +1,248 @@
+import numpy as np
+
+import simulation
+from level_cache import load_level
+from simulation import (TileGrid, PlayerBody, BallBody, LEVEL_PATH, PLAYER_IMAGE, SPAWN, BASE_TICK, TICK,
+                        PLAYER_COLLISION, BALL_COLLISION, NO_BALL, SLOW_BALL, FINISH)
+
+# Параметры, которые можно задать каждому экземпляру отдельно (число или массив длины n)
+PARAMS = ("GRAVITY", "LIN_AIR_DRAG", "ANG_AIR_DRAG", "GROUND_FRICTION", "THRUST", "ANG_THRUST",
+          "GRAB_RADIUS", "BALL_ELASTICITY", "BALL_STOP_BOUNCE", "BALL_SLOW")
+
+WIGGLE_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+WIGGLE_LIMIT = 256
+
+
+def layer_grid(level: TileGrid, mask: int) -> np.ndarray:
+    # Битовая карта TileGrid как булева сетка [row, col], row снизу
+    cells = np.frombuffer(level.cells, dtype=np.uint8).reshape(level.height, level.width)
+    return (cells & mask) != 0
+
+
+def layer_table(level: TileGrid, mask: int) -> np.ndarray:
+    # Таблица префиксных сумм сетки: число занятых клеток в любом прямоугольнике
+    # считается по четырём элементам, сколько бы клеток он ни накрывал
+    grid = layer_grid(level, mask)
+    table = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=np.int32)
+    table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+class BatchSimulation:
+    # N независимых заездов в массивах (struct-of-arrays), шаг для всех сразу.
+    # Модель упрощена по сравнению с Simulation: хитбоксы — габаритные прямоугольники
+    # повёрнутых многоугольников, при столкновении дрон откатывается по оси без заезда
+    # на ступеньки. Для подбора констант и сравнения политик управления этого хватает,
+    # точное время заезда считает Simulation. tick — длина шага физики, как у Simulation
+    def __init__(self, n: int, level_path: str = LEVEL_PATH, tick: float = TICK, **params):
+        self.n = n
+        self.tick = tick
+        # Во сколько раз шаг длиннее исходного кадра 1/60 с
+        self.scale = tick / BASE_TICK
+        level = load_level(level_path)
+        self.level = TileGrid(level_path, level)
+        self.spawn = level.objects.get("spawn", SPAWN)
+        self.size = self.level.tile_size
+        # [0] — дрон без мяча, [1] — с мячом
+        self.player_solid = np.stack([layer_table(self.level, mask) for mask in PLAYER_COLLISION])
+        self.ball_solid = layer_table(self.level, BALL_COLLISION)
+        self.no_ball = layer_table(self.level, NO_BALL)
+        self.slow_ball = layer_table(self.level, SLOW_BALL)
+        self.finish = layer_table(self.level, FINISH)
+
+        for name in PARAMS:
+            value = params.pop(name.lower(), getattr(simulation, name))
+            setattr(self, name.lower(), np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy())
+        if params:
+            raise TypeError(f"Неизвестные параметры: {', '.join(params)}")
+
+        player = PlayerBody(level.properties.get("player", PLAYER_IMAGE), self.spawn)
+        ball = BallBody(self.spawn)
+        self.player_points = np.array(player.hit_box_points, dtype=np.float64)
+        self.ball_points = np.array(ball.hit_box_points, dtype=np.float64)
+        self.max_wiggle = (player.width + player.height) / 2
+        self.ball_min = self.ball_points.min(axis=0)
+        self.ball_max = self.ball_points.max(axis=0)
+
+        self.reset()
+
+    def reset(self) -> None:
+        n = self.n
+        self.px = np.full(n, float(self.spawn[0]))
+        self.py = np.full(n, float(self.spawn[1]))
+        self.pvx = np.zeros(n)
+        self.pvy = np.zeros(n)
+        self.angle = np.zeros(n)
+        self.change_angle = np.zeros(n)
+        self.grounded = np.zeros(n, dtype=bool)
+        self.bx = np.full(n, float(self.spawn[0]))
+        self.by = np.full(n, float(self.spawn[1]))
+        self.bvx = np.zeros(n)
+        self.bvy = np.zeros(n)
+        self.ball_grabbed = np.zeros(n, dtype=bool)
+        self.armed = np.zeros(n, dtype=bool)
+        self.prev_arm = np.zeros(n, dtype=bool)
+        self.prev_grab = np.zeros(n, dtype=bool)
+        self.started = np.zeros(n, dtype=bool)
+        self.ended = np.zeros(n, dtype=bool)
+        self.timer = np.zeros(n)
+        self.bounces = np.zeros(n, dtype=np.int64)
+        self.ticks = 0
+
+    def overlaps(self, table: np.ndarray, left, bottom, right, top, layer=None) -> np.ndarray:
+        # Есть ли занятые клетки под прямоугольниками: четыре чтения таблицы на экземпляр.
+        # Касание не считается — иначе откат по оси оставлял бы дрон прилипшим к полу
+        size = self.size
+        height, width = table.shape[-2] - 1, table.shape[-1] - 1
+        c0 = np.clip(np.floor(left / size).astype(np.int64), 0, width)
+        c1 = np.clip(np.ceil(right / size).astype(np.int64), c0, width)
+        r0 = np.clip(np.floor(bottom / size).astype(np.int64), 0, height)
+        r1 = np.clip(np.ceil(top / size).astype(np.int64), r0, height)
+        if layer is not None:
+            # Стопка таблиц: у каждого экземпляра своя
+            return (table[layer, r1, c1] - table[layer, r0, c1] - table[layer, r1, c0] + table[layer, r0, c0]) > 0
+        return (table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]) > 0
+
+    def player_box(self):
+        rad = np.radians(self.angle)[:, None]
+        c, s = np.cos(rad), np.sin(rad)
+        x, y = self.player_points[:, 0], self.player_points[:, 1]
+        rx = x * c + y * s
+        ry = -x * s + y * c
+        return rx.min(axis=1), ry.min(axis=1), rx.max(axis=1), ry.max(axis=1)
+
+    def player_hits(self, table, px, py, box, layer=None) -> np.ndarray:
+        min_x, min_y, max_x, max_y = box
+        return self.overlaps(table, px + min_x, py + min_y, px + max_x, py + max_y, layer)
+
+    def solid_hits(self, px, py, box) -> np.ndarray:
+        return self.player_hits(self.player_solid, px, py, box, self.ball_grabbed.view(np.int8))
+
+    def ball_hits(self, table, bx, by) -> np.ndarray:
+        return self.overlaps(table, bx + self.ball_min[0], by + self.ball_min[1],
+                             bx + self.ball_max[0], by + self.ball_max[1])
+
+    def wiggle_until_free(self, box) -> None:
+        # Как Simulation.wiggle_until_free: восемь направлений с удваивающимся шагом.
+        # Застревают единицы, поэтому перебор идёт только по ним
+        stuck = np.flatnonzero(self.solid_hits(self.px, self.py, box))
+        layer = self.ball_grabbed.view(np.int8)
+        distance = 1
+        while stuck.size and distance <= WIGGLE_LIMIT:
+            for dx, dy in WIGGLE_DIRECTIONS:
+                x = self.px[stuck] + dx * distance
+                y = self.py[stuck] + dy * distance
+                free = ~self.player_hits(self.player_solid, x, y, tuple(b[stuck] for b in box), layer[stuck])
+                self.px[stuck[free]] = x[free]
+                self.py[stuck[free]] = y[free]
+                stuck = stuck[~free]
+                if not stuck.size:
+                    break
+            distance *= 2
+
+    # acceleration, roll — оси (массивы длины n или числа), grab и arm — кнопки
+    def step(self, acceleration=0, roll=0, grab=False, arm=False) -> None:
+        n = self.n
+        tick, scale = self.tick, self.scale
+        acceleration = np.broadcast_to(np.asarray(acceleration, dtype=np.float64), (n,))
+        roll = np.broadcast_to(np.asarray(roll, dtype=np.float64), (n,))
+        grab = np.broadcast_to(np.asarray(grab, dtype=bool), (n,))
+        arm = np.broadcast_to(np.asarray(arm, dtype=bool), (n,))
+
+        self.armed ^= arm & ~self.prev_arm
+        self.prev_arm = arm.copy()
+        acceleration = np.where(self.armed, acceleration * self.thrust, 0)
+        roll = np.where(self.armed, roll * self.ang_thrust, 0)
+
+        # PlayerBody.update
+        self.change_angle += roll * scale
+        self.change_angle *= self.ang_air_drag ** scale
+        self.angle = (self.angle + self.change_angle * tick) % 360
+        rad = np.radians(self.angle)
+        self.pvx += np.sin(rad) * acceleration * tick
+        self.pvy += np.cos(rad) * acceleration * tick
+        self.pvy -= self.gravity * tick
+        self.pvx -= self.lin_air_drag * self.pvx * tick
+        self.pvy -= self.lin_air_drag * self.pvy * tick
+        friction = np.where(self.grounded, self.ground_friction * tick, 0)
+        self.pvx -= friction * self.pvx
+        self.pvy -= friction * self.pvy
+
+        box = self.player_box()
+        self.grounded = self.solid_hits(self.px, self.py + self.pvy * scale - 1, box)
+
+        # Захват и отпускание мяча
+        near = np.hypot(self.px - self.bx, self.py - self.by) < self.grab_radius
+        in_no_ball = self.player_hits(self.no_ball, self.px, self.py, box)
+        take = ~self.prev_grab & ~self.ball_grabbed & grab & ~in_no_ball & near
+        release = self.ball_grabbed & ~grab
+        self.started |= take & ~self.ended
+        self.ball_grabbed = (self.ball_grabbed | take) & ~release
+        self.bvx = np.where(release, self.pvx, self.bvx)
+        self.bvy = np.where(release, self.pvy, self.bvy)
+        self.prev_grab = grab.copy()
+
+        # Поворот от физического движка, как в Simulation.move_player: застрявший дрон
+        # выталкивается, а если поворот выталкивает слишком далеко — отменяется
+        self.wiggle_until_free(box)
+        old_x, old_y, old_angle = self.px.copy(), self.py.copy(), self.angle
+        self.angle = self.angle + self.change_angle * scale
+        box = self.player_box()
+        self.wiggle_until_free(box)
+        glitch = np.hypot(self.px - old_x, self.py - old_y) > self.max_wiggle
+        self.px = np.where(glitch, old_x, self.px)
+        self.py = np.where(glitch, old_y, self.py)
+        self.angle = np.where(glitch, old_angle, self.angle)
+        box = self.player_box()
+
+        # Движение дрона по осям с откатом при столкновении
+        ny = self.py + self.pvy * scale
+        hit = self.solid_hits(self.px, ny, box)
+        self.py = np.where(hit, self.py, ny)
+        self.pvy = np.where(hit, 0, self.pvy)
+        nx = self.px + self.pvx * scale
+        hit = self.solid_hits(nx, self.py, box)
+        self.px = np.where(hit, self.px, nx)
+        self.pvx = np.where(hit, 0, self.pvx)
+
+        # Мяч в захвате висит под дроном
+        rad = np.radians(self.angle)
+        held_x = self.px - np.sin(rad) * 24
+        held_y = self.py - np.cos(rad) * 24
+
+        # BallBody.update и Simulation.update_ball_collision для свободных мячей
+        free = ~self.ball_grabbed
+        bvx = self.bvx - self.lin_air_drag * self.bvx * tick
+        bvy = self.bvy - self.gravity * tick
+        bvy = bvy - self.lin_air_drag * bvy * tick
+        slow = self.ball_hits(self.slow_ball, self.bx, self.by)
+        bvx = np.where(slow, bvx * self.ball_slow ** scale, bvx)
+        bvy = np.where(slow, bvy * self.ball_slow ** scale, bvy)
+
+        # При ударе скорость разворачивается с потерей, мяч сдвигается на неё от старой точки
+        bx = self.bx + bvx * scale
+        hit = self.ball_hits(self.ball_solid, bx, self.by)
+        bvx = np.where(hit, -bvx * self.ball_elasticity, bvx)
+        bx = np.where(hit, self.bx + bvx * scale, bx)
+        bvx = np.where(hit & self.ball_hits(self.ball_solid, bx, self.by), 0, bvx)
+        bounces = hit
+
+        by = self.by + bvy * scale
+        hit = self.ball_hits(self.ball_solid, bx, by)
+        bvy = np.where(hit, -bvy * self.ball_elasticity, bvy)
+        bvy = np.where(hit & (np.abs(bvy) < self.ball_stop_bounce), 0, bvy)
+        by = np.where(hit, self.by + bvy * scale, by)
+        bvy = np.where(hit & self.ball_hits(self.ball_solid, bx, by), 0, bvy)
+        bounces |= hit
+
+        self.bx = np.where(free, bx, held_x)
+        self.by = np.where(free, by, held_y)
+        self.bvx = np.where(free, bvx, self.bvx)
+        self.bvy = np.where(free, bvy, self.bvy)
+        self.bounces += free & bounces
+
+        self.timer += np.where(self.started, tick, 0)
+        done = self.started & self.ball_hits(self.finish, self.bx, self.by)
+        self.started &= ~done
+        self.ended |= done
+        self.ticks += 1
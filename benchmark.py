@@ -0,0 +1,265 @@
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from level_cache import compile_level
+from profiler import profiler
+from simulation import Simulation, TileGrid, LEVEL_PATH
+
+# Бенчмарк физики без окна: заранее записанные траектории на настоящей карте и
+# на синтетических картах с плотными стенами. python benchmark.py сравнивает с
+# benchmarks/baseline.json и возвращает 1, если что-то стало медленнее допуска;
+# python benchmark.py --save записывает новую базу
+BASELINE_PATH = Path("benchmarks/baseline.json")
+TSX_PATH = Path("images/smbu.tsx").resolve()
+TICKS = 3000
+# Соседи по железу замедляют отдельные прогоны на 20-40%. Самый быстрый из
+# REPEATS повторов (см. run_all) гуляет от запуска к запуску до 30%, поэтому
+# регрессом считаем то, что дольше базы больше чем в 1 + TOLERANCE раз
+TOLERANCE = 0.4
+REPEATS = 7
+SECTION_FLOOR_US = 2  # Подсистемы: рост меньше этого на шаг регрессом не считается
+
+
+# Траектории: списки аргументов Simulation.step. Дрон взводится на втором шаге
+def hover(ticks: int) -> list:
+    # Тяга чуть выше веса и покачивание
+    return [(0.52, 0.3 * np.sin(i / 30), False, i == 1) for i in range(ticks)]
+
+
+def traverse(ticks: int) -> list:
+    # Полный газ с резкими наклонами влево-вправо
+    return [(1.0, 1.0 if (i // 45) % 4 in (0, 3) else -1.0, False, i == 1) for i in range(ticks)]
+
+
+def dribble(ticks: int) -> list:
+    # Дрон таскает мяч и бросает его в разгоне, мяч скачет по стенам
+    return [(0.8, 0.8 if (i // 120) % 2 else -0.8, (i // 60) % 2 == 0, i == 1) for i in range(ticks)]
+
+
+def grab_release(ticks: int) -> list:
+    # Захват и отпускание через шаг, дрон висит рядом с мячом
+    return [(0.5, 0.0, (i // 2) % 2 == 0, i == 1) for i in range(ticks)]
+
+
+TRACES = {"hover": hover, "traverse": traverse, "dribble": dribble, "grab_release": grab_release}
+
+
+def write_tmx(path: Path, solid: np.ndarray, tile_size: int = 24) -> None:
+    # Карта в формате Tiled: solid — булева сетка [row, col], строки сверху вниз.
+    # Стены и слой коллизий совпадают, остальные слои пустые
+    height, width = solid.shape
+    gids = solid.astype(np.uint32)
+    empty = np.zeros_like(gids)
+    layers = []
+    for i, (name, data) in enumerate((("walls", gids), ("collision", gids), ("ball_solid", empty),
+                                      ("only_ball", empty), ("no_ball", empty), ("with_ball", empty),
+                                      ("slow_ball", empty), ("finish", empty))):
+        csv = ",\n".join(",".join(map(str, row)) for row in data)
+        layers.append(f' <layer id="{i + 1}" name="{name}" width="{width}" height="{height}">\n'
+                      f'  <data encoding="csv">\n{csv}\n</data>\n </layer>\n')
+    path.write_text('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<map version="1.10" tiledversion="1.11.2" orientation="orthogonal" renderorder="right-down" width="{width}" '
+                    f'height="{height}" tilewidth="{tile_size}" tileheight="{tile_size}" infinite="0" '
+                    f'nextlayerid="9" nextobjectid="1">\n'
+                    f' <tileset firstgid="1" source="{TSX_PATH}"/>\n' + "".join(layers) + "</map>\n")
+
+
+def stress_maps(directory: Path) -> dict:
+    rng = np.random.default_rng(7)
+    maps = {}
+
+    # Частые столбы: у дрона и мяча всегда рядом много занятых клеток
+    solid = np.zeros((200, 500), dtype=bool)
+    solid[::4, ::4] = True
+    maps["pillars"] = solid
+
+    # Пещера: четверть клеток занята случайно
+    maps["cave"] = rng.random((200, 500)) < 0.25
+
+    # Большая карта — для времени загрузки
+    maps["large"] = rng.random((400, 2000)) < 0.1
+
+    paths = {}
+    for name, solid in maps.items():
+        # Рамка и пустое место у точки старта
+        solid[0, :] = solid[-1, :] = solid[:, 0] = solid[:, -1] = True
+        solid[-12:-1, 1:16] = False
+        path = directory / f"{name}.tmx"
+        write_tmx(path, solid)
+        paths[name] = path
+    return paths
+
+
+def calibrate(samples: list) -> None:
+    # Время фиксированной работы на чистом Python, мкс. Скорость машины гуляет
+    # (частота, соседи по железу), поэтому с базой сравнивается отношение к нему.
+    # Замер повторяется перед каждым прогоном, а в результат идёт самый быстрый
+    # за весь запуск: один замер шумит не меньше, чем сама физика
+    start = time.perf_counter_ns()
+    total = 0
+    for i in range(200_000):
+        total += i * i % 7
+    samples.append((time.perf_counter_ns() - start) / 1000)
+
+
+# Один прогон траектории: время каждого шага, а отдельным проходом — суммы
+# по подсистемам через профайлер
+def run_trace(sim: Simulation, inputs: list) -> tuple:
+    clock = time.perf_counter_ns
+    sim.reset()
+    times = np.empty(len(inputs), dtype=np.int64)
+    for i, args in enumerate(inputs):
+        start = clock()
+        sim.step(*args)
+        times[i] = clock() - start
+
+    sim.reset()
+    profiler.events.clear()
+    profiler.enabled = True
+    for args in inputs:
+        sim.step(*args)
+    profiler.enabled = False
+    sections = {}
+    for _, name, start, end in profiler.events:
+        sections[name] = sections.get(name, 0) + end - start
+    profiler.events.clear()
+    return times, sections
+
+
+# Память — отдельно: tracemalloc сильно замедляет
+def trace_memory(level_path, inputs: list) -> float:
+    tracemalloc.start()
+    sim = Simulation(level_path)
+    for args in inputs:
+        sim.step(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def run_load(level_path) -> tuple:
+    path = Path(level_path)
+    start = time.perf_counter()
+    compile_level(path)
+    compile_time = time.perf_counter() - start
+    TileGrid(level_path)  # Прогреть кэш
+    start = time.perf_counter()
+    TileGrid(level_path)
+    return compile_time, time.perf_counter() - start
+
+
+# Повторы идут по кругу через все сценарии, а не подряд: замедление от соседей
+# длится секунды и иначе съедает все повторы одного сценария. От каждого
+# сценария остаётся самый быстрый повтор, от каждой подсистемы — самая быстрая
+def run_all(ticks: int, repeats: int = REPEATS) -> dict:
+    loads, traces, samples = {}, {}, []
+    inputs = {name: trace(ticks) for name, trace in TRACES.items()}
+    with tempfile.TemporaryDirectory() as directory:
+        maps = {"untitled": Path(LEVEL_PATH), **stress_maps(Path(directory))}
+        sims = {}
+        for _ in range(repeats):
+            for map_name, level_path in maps.items():
+                calibrate(samples)
+                times = run_load(level_path)
+                loads[map_name] = [min(old, new) for old, new in zip(loads.get(map_name, times), times)]
+                if map_name == "large":
+                    continue
+                if map_name not in sims:
+                    sims[map_name] = Simulation(level_path)
+                for trace_name, trace in inputs.items():
+                    calibrate(samples)
+                    times, sections = run_trace(sims[map_name], trace)
+                    best = traces.setdefault((map_name, trace_name), (times, sections))
+                    traces[map_name, trace_name] = (times if times.sum() < best[0].sum() else best[0],
+                                                    {name: min(ns, best[1].get(name, ns)) for name, ns in sections.items()})
+
+        results = {}
+        for map_name, level_path in maps.items():
+            compile_time, cached_time = loads[map_name]
+            results[f"{map_name}/load"] = {"compile_ms": compile_time * 1000, "cached_ms": cached_time * 1000}
+            if map_name == "large":
+                continue
+            for trace_name, trace in inputs.items():
+                times, sections = traces[map_name, trace_name]
+                results[f"{map_name}/{trace_name}"] = {
+                    "ticks_per_s": len(trace) / (times.sum() / 1e9),
+                    "p50_us": float(np.percentile(times, 50)) / 1000,
+                    "p99_us": float(np.percentile(times, 99)) / 1000,
+                    "max_us": float(times.max()) / 1000,
+                    "peak_kb": trace_memory(level_path, trace),
+                    "sections_us": {name: ns / len(trace) / 1000 for name, ns in sorted(sections.items())},
+                }
+    for result in results.values():
+        result["calibration_us"] = min(samples)
+    return results
+
+
+# Что хуже базы больше чем на tolerance: меньше шагов в секунду, дольше
+# подсистемы и загрузка. Базу пересчитываем на текущую скорость машины
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        speed = result["calibration_us"] / base["calibration_us"]
+        # Шагов в секунду меньше — значит, шаг дольше больше чем в 1 + tolerance раз
+        if "ticks_per_s" in result and result["ticks_per_s"] * (1 + tolerance) < base["ticks_per_s"] / speed:
+            found.append(f"{key}: {result['ticks_per_s']:.0f} шагов/с, ожидалось {base['ticks_per_s'] / speed:.0f}")
+        for name, value in result.get("sections_us", {}).items():
+            old = base.get("sections_us", {}).get(name)
+            # Мелкие подсистемы — это в основном накладные расходы самого
+            # профайлера, пара микросекунд на них шумит сильнее, чем меняется
+            if old is not None and value > old * speed * (1 + tolerance) and value - old * speed > SECTION_FLOOR_US:
+                found.append(f"{key}: {name} {value:.1f} мкс/шаг, ожидалось {old * speed:.1f}")
+        for name in ("compile_ms", "cached_ms"):
+            if name in result and result[name] > base[name] * speed * (1 + tolerance) and result[name] - base[name] * speed > 5:
+                found.append(f"{key}: {name} {result[name]:.1f}, ожидалось {base[name] * speed:.1f}")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк физики без окна")
+    parser.add_argument("--save", action="store_true", help="записать результаты как новую базу")
+    parser.add_argument("--ticks", type=int, default=TICKS)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    # Сборщик мусора даёт случайные паузы посреди замеров
+    gc.disable()
+    results = run_all(args.ticks)
+    gc.enable()
+    for key, result in results.items():
+        if "ticks_per_s" in result:
+            print(f"{key:<24}{result['ticks_per_s']:9.0f} шагов/с  p50 {result['p50_us']:7.1f} мкс  "
+                  f"p99 {result['p99_us']:7.1f} мкс  max {result['max_us']:8.1f} мкс  "
+                  f"память {result['peak_kb']:7.0f} КБ")
+        else:
+            print(f"{key:<24}разбор {result['compile_ms']:7.1f} мс  из кэша {result['cached_ms']:6.1f} мс")
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=1, ensure_ascii=False))
+        print("База записана в", args.baseline)
+        return 0
+    if not args.baseline.exists():
+        print("Базы нет, запустите с --save")
+        return 0
+
+    found = regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for line in found:
+        print("РЕГРЕСС", line)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
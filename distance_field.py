@@ -0,0 +1,216 @@
+import heapq
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from level_cache import CACHE_DIR, GID_MASK, LevelData, load_level
+from simulation import BASE_TICK, GRAVITY, LIN_AIR_DRAG, SPAWN, THRUST
+
+# Поле расстояний до финиша: для каждой клетки карты — длина кратчайшего пути
+# до ближайшей клетки слоя finish для дрона с мячом, то есть в обход слоёв
+# CARRY_COLLISION (collision, only_ball, no_ball). Считается Дейкстрой по
+# восьми соседям один раз на карту и лежит рядом с кэшем уровня
+# (__levelcache__/<карта>.dist.npz) как uint32 в пикселях; пересчитывается,
+# когда меняется sha1 исходников карты. По полю считаются прогресс мяча по
+# трассе (одно чтение клетки на шаг) и время на кубки для новых карт.
+#
+# Физический предел времени (min_time) — только для сведения. Мяч можно
+# бросить сквозь only_ball, а несомый мяч проходит ball_solid, поэтому путь
+# для предела берётся по клеткам, куда мяч попадает хоть как-то, а скорость —
+# MAX_SPEED. Дрон успевает разогнаться до захвата, с которого идёт таймер,
+# так что предел выходит доли секунды при золоте в минуты: отсеивать им
+# результаты бессмысленно, честность заезда проверяет реплей
+FIELD_VERSION = 3
+CARRY_BLOCKING = ("collision", "only_ball", "no_ball")
+BALL_BLOCKING = ("collision", "ball_solid")
+FINISH = "finish"
+# Путь на больших картах бывает длиннее 65 тыс. пикс, поэтому uint32
+UNREACHABLE = 0xFFFFFFFF
+# Путь по восьми соседям длиннее прямой не больше чем в столько раз (под 22.5°)
+OCTILE_STRETCH = math.cos(math.pi / 8) + (math.sqrt(2) - 1) * math.sin(math.pi / 8)
+# Запас на то, что мяч не в центре клетки, а финиш засчитывается касанием
+MARGIN_TILES = 3
+# Предел скорости, пикс/с: газ вниз вместе с гравитацией против сопротивления
+# воздуха. Брошенный мяч быстрее дрона, который его бросил, не разгоняется
+MAX_SPEED = (THRUST + GRAVITY) / LIN_AIR_DRAG / BASE_TICK
+# Темп на кубки, пикс/с. Подобран по первой трассе, чтобы на ней выходили
+# прежние 120 и 180 с; новые карты без своих gold_time/silver_time получают
+# время по длине трассы
+GOLD_PACE = 17.2
+SILVER_PACE = 11.5
+
+
+def field_path(path: Path) -> Path:
+    return path.parent / CACHE_DIR / (path.stem + ".dist.npz")
+
+
+def blocked_cells(level: LevelData, names) -> np.ndarray:
+    cells = np.zeros((level.height, level.width), dtype=bool)
+    for name in names:
+        if name in level.layers:
+            cells |= (level.layers[name] & GID_MASK) != 0
+    return cells[::-1]
+
+
+# Дейкстра от всех клеток финиша сразу по клеткам, где blocked ложно. Строки
+# снизу вверх, как в TileGrid. По диагонали можно, если свободна хотя бы одна
+# из двух клеток сбоку — угол огибается через неё, а между двумя стенами,
+# сходящимися углами, не пролезть
+def compute_field(level: LevelData, blocked: np.ndarray) -> np.ndarray:
+    width, height, size = level.width, level.height, level.tile_width
+    blocked = blocked.ravel().tolist()
+    finish = level.layers.get(FINISH)
+    sources = [] if finish is None else np.flatnonzero((finish[::-1] & GID_MASK).ravel()).tolist()
+
+    diagonal = size * math.sqrt(2)
+    distance = [math.inf] * (width * height)
+    queue = []
+    for cell in sources:
+        distance[cell] = 0.0
+        queue.append((0.0, cell))
+    heapq.heapify(queue)
+    while queue:
+        d, cell = heapq.heappop(queue)
+        if d > distance[cell]:
+            continue
+        row, col = divmod(cell, width)
+        for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            r, c = row + dr, col + dc
+            if not (0 <= r < height and 0 <= c < width):
+                continue
+            near = r * width + c
+            if blocked[near]:
+                continue
+            if dr and dc:
+                if blocked[row * width + c] and blocked[r * width + col]:
+                    continue
+                step = d + diagonal
+            else:
+                step = d + size
+            if step < distance[near]:
+                distance[near] = step
+                heapq.heappush(queue, (step, near))
+
+    field = np.array(distance).reshape(height, width)
+    return np.where(np.isfinite(field), np.minimum(np.round(field), UNREACHABLE - 1), UNREACHABLE).astype(np.uint32)
+
+
+# Расстояние от места, где мяч лежит перед заездом: он падает из точки
+# старта прямо вниз до пола
+def start_distance(distance: np.ndarray, tile_size: int, spawn) -> int:
+    height, width = distance.shape
+    col = min(max(int(spawn[0] // tile_size), 0), width - 1)
+    top = min(max(int(spawn[1] // tile_size), 0), height - 1)
+    start = UNREACHABLE
+    for d in distance[:top + 1, col][::-1]:
+        if d == UNREACHABLE:
+            if start != UNREACHABLE:
+                break  # Упал на пол
+            continue
+        start = min(start, int(d))
+    return start
+
+
+class DistanceField:
+    # distance — поле по маршруту с мячом, [row, col] в пикселях, строки снизу
+    # вверх; bound_start — длина пути для физического предела (см. выше)
+    def __init__(self, distance: np.ndarray, tile_size: int, spawn=SPAWN, bound_start: int = UNREACHABLE):
+        self.height, self.width = distance.shape
+        self.tile_size = tile_size
+        self.cells = distance.ravel().tolist()  # Чтение из списка быстрее, чем из массива numpy
+        self.start = start_distance(distance, tile_size, spawn)
+        self.bound_start = bound_start
+
+    @property
+    def reachable(self) -> bool:
+        return self.start != UNREACHABLE
+
+    def at(self, x: float, y: float) -> int:
+        size = self.tile_size
+        col, row = int(x // size), int(y // size)
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.cells[row * self.width + col]
+        return UNREACHABLE
+
+    # Доля пройденного пути 0..1; None — мяч в стене или за картой
+    def progress(self, x: float, y: float):
+        d = self.at(x, y)
+        if d == UNREACHABLE or not self.reachable:
+            return None
+        return max(0.0, 1 - d / self.start) if self.start else 1.0
+
+    # Физический предел времени, с — только для сведения
+    @property
+    def min_time(self) -> float:
+        if self.bound_start == UNREACHABLE:
+            return 0.0
+        return max(0.0, self.bound_start / OCTILE_STRETCH - MARGIN_TILES * self.tile_size) / MAX_SPEED
+
+    @property
+    def gold_time(self) -> float:
+        return float(round(self.start / GOLD_PACE))
+
+    @property
+    def silver_time(self) -> float:
+        return float(round(self.start / SILVER_PACE))
+
+
+def save_field(path: Path, arrays: dict) -> None:
+    cache = field_path(path)
+    cache.parent.mkdir(exist_ok=True)
+    tmp = cache.with_name(f"{cache.stem}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, cache)
+
+
+def load_cached_field(path: Path, level: LevelData):
+    try:
+        with np.load(field_path(path)) as archive:
+            if archive["version"] == FIELD_VERSION and str(archive["digest"]) == level.digest:
+                return archive["distance"], int(archive["bound_start"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+# Поле из кэша, а если его нет или карта поменялась — посчитать и сохранить
+def load_field(path, level: LevelData = None) -> DistanceField:
+    path = Path(path)
+    if level is None:
+        level = load_level(path)
+    spawn = level.objects.get("spawn", SPAWN)
+    cached = load_cached_field(path, level)
+    if cached is None:
+        carry = blocked_cells(level, CARRY_BLOCKING)
+        distance = compute_field(level, carry)
+        # Мяч проходит клетку, если её проходит либо он сам, либо дрон с ним
+        anywhere = compute_field(level, carry & blocked_cells(level, BALL_BLOCKING))
+        cached = distance, start_distance(anywhere, level.tile_width, spawn)
+        try:
+            save_field(path, {"version": np.array(FIELD_VERSION), "digest": np.array(level.digest),
+                              "distance": distance, "bound_start": np.array(cached[1])})
+        except OSError:
+            pass
+    distance, bound_start = cached
+    return DistanceField(distance, level.tile_width, spawn, bound_start)
+
+
+# python distance_field.py levels/*.tmx — посчитать поля заранее и посмотреть,
+# какое время на кубки получит карта без своих gold_time/silver_time
+if __name__ == "__main__":
+    import sys
+
+    for name in sys.argv[1:]:
+        try:
+            field = load_field(name)
+        except Exception as e:
+            print(name, "не загружается:", e)
+            continue
+        if not field.reachable:
+            print(name, "финиш недостижим от точки старта")
+            continue
+        print(f"{name}: путь с мячом {field.start} пикс, золото {field.gold_time:.0f} с, "
+              f"серебро {field.silver_time:.0f} с, физический предел {field.min_time:.2f} с")
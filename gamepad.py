@@ -0,0 +1,109 @@
+from collections import deque
+from time import perf_counter_ns
+
+GRAB_BUTTON = 3
+ARM_BUTTON = 7
+RING_SIZE = 4096
+IDLE = (0, 1, False, False)  # Газ на нуле, без кнопок — как без джойстика
+X, Y, BUTTON = range(3)
+
+
+class Gamepads:
+    # Вход джойстиков как поток событий с метками времени. Обработчики событий
+    # pyglet кладут каждое изменение осей и кнопок в кольцо в момент, когда
+    # цикл событий его принял, — сразу, а не раз в кадр, так что даже нажатие
+    # короче кадра не теряется. Отдельный поток опроса не нужен: joystick.x и
+    # joystick.buttons pyglet обновляет в том же цикле событий, нового поток
+    # бы не увидел. События приходят из одного потока, поэтому метки в кольце
+    # идут по порядку.
+    #
+    # Физика забирает события до конца своего шага (read): оси — последнее
+    # значение, кнопка считается нажатой, если была нажата хоть раз за шаг.
+    # Каждому open соответствует close: джойстики открываются и закрываются
+    # парой, повторный open у pyglet — ошибка
+    def __init__(self, size: int = RING_SIZE):
+        self.events = deque(maxlen=size)  # (время нс, номер джойстика, X/Y/BUTTON, кнопка, значение)
+        self.joysticks = []
+        self.handlers = []
+        self.state = []  # [x, y, {кнопка: нажата}, {кнопка: нажималась за шаг}]
+        self.pending = None  # Событие из будущего, ждёт своего шага
+
+    def __len__(self) -> int:
+        return len(self.joysticks)
+
+    def open(self, joysticks) -> None:
+        self.close()
+        self.events.clear()
+        self.pending = None
+        for i, joystick in enumerate(joysticks):
+            joystick.open()
+            self.joysticks.append(joystick)
+            buttons = {GRAB_BUTTON: bool(joystick.buttons[GRAB_BUTTON]), ARM_BUTTON: bool(joystick.buttons[ARM_BUTTON])}
+            self.state.append([joystick.x, joystick.y, buttons, set()])
+            handlers = self.event_handlers(i)
+            joystick.push_handlers(**handlers)
+            self.handlers.append(handlers)
+
+    def close(self) -> None:
+        for joystick, handlers in zip(self.joysticks, self.handlers):
+            joystick.remove_handlers(**handlers)
+            joystick.close()
+        self.joysticks = []
+        self.handlers = []
+        self.state = []
+
+    def event_handlers(self, index: int) -> dict:
+        push = self.events.append
+
+        def on_joybutton_press(_, button):
+            if button in (GRAB_BUTTON, ARM_BUTTON):
+                push((perf_counter_ns(), index, BUTTON, button, True))
+
+        def on_joybutton_release(_, button):
+            if button in (GRAB_BUTTON, ARM_BUTTON):
+                push((perf_counter_ns(), index, BUTTON, button, False))
+
+        def on_joyaxis_motion(_, axis, value):
+            if axis == "x":
+                push((perf_counter_ns(), index, X, 0, value))
+            elif axis == "y":
+                push((perf_counter_ns(), index, Y, 0, value))
+
+        return {"on_joybutton_press": on_joybutton_press, "on_joybutton_release": on_joybutton_release,
+                "on_joyaxis_motion": on_joyaxis_motion}
+
+    def apply(self, event) -> None:
+        _, i, kind, button, value = event
+        state = self.state[i]
+        if kind == X:
+            state[0] = value
+        elif kind == Y:
+            state[1] = value
+        else:
+            state[2][button] = value
+            if value:
+                state[3].add(button)
+
+    # Вход каждого джойстика на шаг физики, который кончается в момент until (нс)
+    def read(self, until: int) -> list:
+        if not self.joysticks:
+            return [IDLE]
+        for state in self.state:
+            state[3].clear()
+        events = self.events
+        if self.pending is not None:
+            if self.pending[0] > until:
+                return self.inputs()
+            self.apply(self.pending)
+            self.pending = None
+        while events:
+            event = events.popleft()
+            if event[0] > until:
+                self.pending = event
+                break
+            self.apply(event)
+        return self.inputs()
+
+    def inputs(self) -> list:
+        return [(x, y, buttons[GRAB_BUTTON] or GRAB_BUTTON in pressed, buttons[ARM_BUTTON] or ARM_BUTTON in pressed)
+                for x, y, buttons, pressed in self.state]
@@ -0,0 +1,43 @@
+import arcade
+
+GLYPHS = "0123456789:."
+
+
+def seconds_to_str(s: float) -> str:
+    # Целые миллисекунды — без round() по float и без склейки строк
+    ms = int(s * 1000 + 0.5)
+    return f"{ms // 60000:02}:{ms // 1000 % 60:02}.{ms % 1000:03}"
+
+
+class GlyphText:
+    # Строка из заранее нарисованных символов: каждый символ GLYPHS один раз
+    # рисуется в текстуру атласа, дальше смена текста — это смена текстуры у
+    # спрайтов тех позиций, где символ поменялся. Раскладки глифов pyglet на
+    # каждом кадре нет. Ширина ячейки одна на все символы, чтобы цифры не прыгали
+    def __init__(self, text: str, x: float, y: float, color=arcade.color.WHITE, font_size: float = 20):
+        self.textures = {glyph: arcade.create_text_sprite(glyph, color, font_size).texture for glyph in GLYPHS}
+        self.advance = max(texture.width for texture in self.textures.values())
+        self.x = x
+        self.y = y
+        self.sprites = arcade.SpriteList()
+        self.text = ""
+        self.set(text)
+
+    def set(self, text: str) -> None:
+        if text == self.text:
+            return
+        while len(self.sprites) < len(text):
+            i = len(self.sprites)
+            self.sprites.append(arcade.Sprite(self.textures["0"], center_x=self.x + (i + 0.5) * self.advance))
+        for i, glyph in enumerate(text):
+            if i >= len(self.text) or self.text[i] != glyph:
+                sprite = self.sprites[i]
+                sprite.texture = self.textures[glyph]
+                sprite.visible = True
+                sprite.bottom = self.y
+        for sprite in self.sprites[len(text):]:
+            sprite.visible = False
+        self.text = text
+
+    def draw(self) -> None:
+        self.sprites.draw()
@@ -0,0 +1,227 @@
+import atexit
+import os
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from csv import reader, writer
+from pathlib import Path
+
+SCORES_PATH = "scores.csv"
+SKIP_LEVELS = 24  # Хватает на ~16 млн результатов
+
+
+def read_rows(path: Path) -> list:
+    if not path.exists():
+        return []
+    with open(path, newline="") as f:
+        return list(reader(f))
+
+
+def append_rows(path: Path, rows) -> None:
+    with open(path, "a", newline="") as f:
+        writer(f).writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def repair_tail(path: Path) -> None:
+    # Если запись оборвалась посреди строки, хвост без перевода строки отрезается —
+    # иначе "tester,10" от недописанного "tester,100.5" сошёл бы за результат
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class SkipNode:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, levels: int):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels  # Сколько позиций перепрыгивает ссылка next[level]
+
+
+class RankedList:
+    # Отсортированный список на списке с пропусками: у каждой ссылки записано,
+    # через сколько элементов она перепрыгивает, поэтому вставка, место
+    # элемента и элемент по месту — O(log n) в среднем, без сдвига массива.
+    # Позиции в ширинах считаются с единицы, у головы — ноль
+    def __init__(self, values=()):
+        self.head = SkipNode(None, SKIP_LEVELS)
+        self.size = 0
+        self.random = random.Random(0)
+        for value in values:
+            self.insert(value)
+
+    def __len__(self) -> int:
+        return self.size
+
+    # Вставить после равных и вернуть место (с нуля)
+    def insert(self, value) -> int:
+        chain = [self.head] * SKIP_LEVELS
+        positions = [0] * SKIP_LEVELS
+        node, position = self.head, 0
+        for level in range(SKIP_LEVELS - 1, -1, -1):
+            following = node.next[level]
+            while following is not None and following.value <= value:
+                position += node.width[level]
+                node, following = following, following.next[level]
+            chain[level] = node
+            positions[level] = position
+
+        levels = 1
+        while levels < SKIP_LEVELS and self.random.random() < 0.5:
+            levels += 1
+        new = SkipNode(value, levels)
+        for level in range(levels):
+            before = chain[level]
+            new.next[level] = before.next[level]
+            before.next[level] = new
+            new.width[level] = before.width[level] - (position - positions[level])
+            before.width[level] = position - positions[level] + 1
+        for level in range(levels, SKIP_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+        return position
+
+    def node(self, index: int) -> SkipNode:
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node, position = self.head, 0
+        for level in range(SKIP_LEVELS - 1, -1, -1):
+            while node.next[level] is not None and position + node.width[level] <= index + 1:
+                position += node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index: int):
+        return self.node(index).value
+
+    # Первые k по порядку
+    def head_values(self, k: int) -> list:
+        values = []
+        node = self.head.next[0]
+        while node is not None and len(values) < k:
+            values.append(node.value)
+            node = node.next[0]
+        return values
+
+
+class Leaderboard:
+    # scores.csv — журнал, в который строки [имя, время] только дописываются.
+    # Отсортированный индекс (время, номер строки, имя) живёт в памяти в
+    # RankedList: строится один раз при загрузке, дальше вставка, место и
+    # первые k — O(log n + k), файл только дописывается.
+    #
+    # Весь ввод-вывод идёт в отдельном потоке, submit сразу возвращает Future
+    # с местом. Перед записью в scores.csv пачка результатов сохраняется в
+    # scores.csv.wal; если игра упала между ними, при следующем запуске
+    # недописанное доезжает из .wal
+    def __init__(self, path: str = SCORES_PATH):
+        self.path = Path(path)
+        self.wal_path = self.path.with_name(self.path.name + ".wal")
+        self.entries = RankedList()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self) -> None:
+        repair_tail(self.path)
+        repair_tail(self.wal_path)
+        rows = read_rows(self.path)
+        pending = read_rows(self.wal_path)
+        # Начало .wal могло успеть попасть в конец scores.csv
+        done = next(k for k in range(len(pending), -1, -1) if k == 0 or rows[-k:] == pending[:k])
+        if pending[done:]:
+            append_rows(self.path, pending[done:])
+            rows += pending[done:]
+        self.wal_path.unlink(missing_ok=True)
+
+        entries = RankedList()
+        for row in rows:
+            try:
+                entries.insert((float(row[1]), len(entries), row[0]))
+            except (IndexError, ValueError):
+                continue  # Чужая строка
+        with self.lock:
+            self.entries = entries
+
+    # Поток не падает ни на какой ошибке: если таблица не читается (битый файл,
+    # не та кодировка) или не пишется, Future текущей пачки завершаются этой
+    # ошибкой, а загрузка повторяется перед следующей пачкой
+    def run(self) -> None:
+        loaded = False
+        try:
+            self.load()
+            loaded = True
+        except Exception:
+            pass
+
+        while True:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get())
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                try:
+                    if not loaded:
+                        self.load()
+                        loaded = True
+                    self.write(batch)
+                except Exception as e:
+                    # Индекс мог разойтись с недописанным файлом — перечитать
+                    # таблицу и доиграть .wal перед следующей пачкой
+                    loaded = False
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+            if stop:
+                return
+
+    def write(self, batch) -> None:
+        rows = [[name, str(time)] for name, time, _ in batch]
+        append_rows(self.wal_path, rows)
+        append_rows(self.path, rows)
+        self.wal_path.unlink(missing_ok=True)
+
+        for name, time, future in batch:
+            with self.lock:
+                rank = self.entries.insert((time, len(self.entries), name))
+            future.set_result(rank)
+
+    # Поставить результат в очередь. Future вернёт место (с нуля); при равном
+    # времени новый результат встаёт после старых
+    def submit(self, name: str, time: float) -> Future:
+        future = Future()
+        self.queue.put((name, time, future))
+        return future
+
+    def add(self, name: str, time: float) -> int:
+        return self.submit(name, time).result()
+
+    def close(self) -> None:
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def top(self, k: int) -> list:
+        with self.lock:
+            return [(i, name, time) for i, (time, _, name) in enumerate(self.entries.head_values(k))]
+
+    # Первые три места и своё; если сам в первой четвёрке — просто первые четыре
+    def around(self, rank: int) -> list:
+        if rank < 4:
+            return self.top(4)
+        with self.lock:
+            time, _, name = self.entries[rank]
+        return self.top(3) + [(rank, name, time)]
@@ -0,0 +1,154 @@
+import hashlib
+import os
+from pathlib import Path
+from xml.etree import ElementTree
+
+import numpy as np
+import pytiled_parser
+
+# Скомпилированный уровень: слои тайлов как массивы gid и описание тайлсетов.
+# Разбор TMX/TSX занимает заметное время, поэтому результат сохраняется рядом
+# с картой в __levelcache__/ и при следующей загрузке читается одним np.load.
+# Кэш пересобирается, если поменялась версия формата или исходники: сначала
+# сверяются mtime карты и тайлсетов, при расхождении — их sha1.
+CACHE_VERSION = 2
+CACHE_DIR = "__levelcache__"
+GID_MASK = 0x1FFFFFFF  # Старшие биты gid в Tiled — флаги отражения
+
+
+class LevelData:
+    def __init__(self, arrays):
+        self.width, self.height, self.tile_width, self.tile_height = (int(v) for v in arrays["size"])
+        # gid слоёв [row, col], строки сверху вниз, как в TMX
+        self.layers = {str(name): gids for name, gids in zip(arrays["layer_names"], arrays["layers"])}
+        self.tilesets = [
+            {"firstgid": int(firstgid), "columns": int(columns), "count": int(count), "image": str(image)}
+            for firstgid, columns, count, image in zip(arrays["tileset_firstgid"], arrays["tileset_columns"],
+                                                       arrays["tileset_count"], arrays["tileset_image"])
+        ]
+        # gid -> [(gid кадра, длительность в мс), ...]
+        self.animations = {}
+        for gid, frame_gid, duration in arrays["animations"]:
+            self.animations.setdefault(int(gid), []).append((int(frame_gid), int(duration)))
+        # Именованные объекты карты (точка старта и т.п.) -> (x, y), y снизу вверх, как в arcade
+        self.objects = {str(name): (float(x), float(y)) for name, (x, y) in zip(arrays["object_names"], arrays["object_xy"])}
+        # Свойства карты из Tiled, значения строками
+        self.properties = {str(name): str(value) for name, value in zip(arrays["property_names"], arrays["property_values"])}
+        # sha1 карты и тайлсетов — по нему сверяются производные кэши
+        self.digest = str(arrays["digest"])
+
+
+def cache_path(path: Path) -> Path:
+    return path.parent / CACHE_DIR / (path.stem + ".npz")
+
+
+def digest(files) -> str:
+    sha = hashlib.sha1()
+    for file in files:
+        sha.update(Path(file).read_bytes())
+    return sha.hexdigest()
+
+
+def mtimes(files) -> np.ndarray:
+    return np.array([os.stat(file).st_mtime_ns for file in files], dtype=np.int64)
+
+
+def compile_level(path: Path) -> dict:
+    tiled_map = pytiled_parser.parse_map(path)
+    layers = [layer for layer in tiled_map.layers if isinstance(layer, pytiled_parser.TileLayer)]
+    tilesets = [tiled_map.tilesets[firstgid] for firstgid in sorted(tiled_map.tilesets)]
+
+    animations = []
+    for firstgid, tileset in sorted(tiled_map.tilesets.items()):
+        for tile_id, tile in (tileset.tiles or {}).items():
+            for frame in tile.animation or ():
+                animations.append((firstgid + tile_id, firstgid + frame.tile_id, frame.duration))
+
+    # У точки в Tiled y отсчитывается сверху, у прямоугольника берётся центр
+    objects = []
+    pixel_height = tiled_map.map_size.height * tiled_map.tile_size.height
+    for layer in tiled_map.layers:
+        if isinstance(layer, pytiled_parser.ObjectLayer):
+            for tiled_object in layer.tiled_objects:
+                if tiled_object.name:
+                    x = tiled_object.coordinates.x + tiled_object.size.width / 2
+                    y = tiled_object.coordinates.y + tiled_object.size.height / 2
+                    objects.append((tiled_object.name, x, pixel_height - y))
+    properties = tiled_map.properties or {}
+
+    sources = [path] + [(path.parent / tileset.attrib["source"]).resolve()
+                        for tileset in ElementTree.parse(path).getroot().iter("tileset")
+                        if "source" in tileset.attrib]
+    return {
+        "version": np.array(CACHE_VERSION),
+        "sources": np.array([str(source) for source in sources]),
+        "mtimes": mtimes(sources),
+        "digest": np.array(digest(sources)),
+        "size": np.array([tiled_map.map_size.width, tiled_map.map_size.height,
+                          tiled_map.tile_size.width, tiled_map.tile_size.height]),
+        "layer_names": np.array([layer.name for layer in layers]),
+        "layers": np.array([layer.data for layer in layers], dtype=np.uint32).reshape(
+            len(layers), tiled_map.map_size.height, tiled_map.map_size.width),
+        "tileset_firstgid": np.array(sorted(tiled_map.tilesets), dtype=np.int64),
+        "tileset_columns": np.array([tileset.columns for tileset in tilesets], dtype=np.int64),
+        "tileset_count": np.array([tileset.tile_count for tileset in tilesets], dtype=np.int64),
+        "tileset_image": np.array([str(tileset.image) for tileset in tilesets]),
+        "animations": np.array(animations, dtype=np.int64).reshape(-1, 3),
+        "object_names": np.array([name for name, _, _ in objects], dtype=str),
+        "object_xy": np.array([(x, y) for _, x, y in objects], dtype=np.float64).reshape(-1, 2),
+        "property_names": np.array(list(properties), dtype=str),
+        "property_values": np.array([str(value) for value in properties.values()], dtype=str),
+    }
+
+
+def save_cache(path: Path, arrays: dict) -> None:
+    cache = cache_path(path)
+    cache.parent.mkdir(exist_ok=True)
+    # Через временный файл, чтобы параллельный запуск не прочитал половину архива
+    tmp = cache.with_name(f"{cache.stem}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, cache)
+
+
+def load_cached(path: Path):
+    try:
+        with np.load(cache_path(path)) as archive:
+            arrays = dict(archive)
+        if arrays["version"] != CACHE_VERSION:
+            return None
+        sources = [str(source) for source in arrays["sources"]]
+        current = mtimes(sources)
+        if np.array_equal(current, arrays["mtimes"]):
+            return arrays
+        # mtime сменился (git checkout, копирование) — содержимое могло остаться прежним
+        if digest(sources) == arrays["digest"]:
+            arrays["mtimes"] = current
+            save_cache(path, arrays)
+            return arrays
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+# Уровень из кэша, а если его нет или он устарел — разобрать TMX и сохранить кэш
+def load_level(path) -> LevelData:
+    path = Path(path)
+    arrays = load_cached(path)
+    if arrays is None:
+        arrays = compile_level(path)
+        try:
+            save_cache(path, arrays)
+        except OSError:
+            pass  # Папка только для чтения — просто работаем без кэша
+    return LevelData(arrays)
+
+
+# python level_cache.py levels/*.tmx — собрать кэш заранее
+if __name__ == "__main__":
+    import sys
+
+    for name in sys.argv[1:]:
+        level_path = Path(name)
+        save_cache(level_path, compile_level(level_path))
+        print(level_path, "->", cache_path(level_path))
@@ -0,0 +1,89 @@
+import arcade
+import numpy as np
+
+from level_cache import LevelData, GID_MASK
+
+CHUNK_TILES = 64  # Сторона чанка в тайлах
+
+# Текстуры тайлсетов по пути картинки, общие для всех загрузок уровня
+tileset_textures = {}
+
+
+def tile_texture(level: LevelData, gid: int) -> arcade.Texture:
+    tileset = max((t for t in level.tilesets if t["firstgid"] <= gid), key=lambda t: t["firstgid"])
+    textures = tileset_textures.get(tileset["image"])
+    if textures is None:
+        sheet = arcade.load_spritesheet(tileset["image"])
+        textures = sheet.get_texture_grid((level.tile_width, level.tile_height), tileset["columns"],
+                                          tileset["count"], hit_box_algorithm=arcade.hitbox.algo_bounding_box)
+        tileset_textures[tileset["image"]] = textures
+    return textures[gid - tileset["firstgid"]]
+
+
+# Спрайты слоя из скомпилированного уровня — то же, что даёт arcade.load_tilemap,
+# но без разбора TMX. Отражённые тайлы (флаги в gid) в наших картах не используются
+def layer_sprites(level: LevelData, name: str) -> list:
+    gids = level.layers[name] & GID_MASK
+    sprites = []
+    for row, col in zip(*np.nonzero(gids)):
+        gid = int(gids[row, col])
+        x = (col + 0.5) * level.tile_width
+        y = (level.height - row - 0.5) * level.tile_height
+        frames = level.animations.get(gid)
+        if frames:
+            animation = arcade.TextureAnimation([arcade.TextureKeyframe(tile_texture(level, frame), duration, frame)
+                                                 for frame, duration in frames])
+            sprites.append(arcade.TextureAnimationSprite(x, y, animation=animation))
+        else:
+            sprites.append(arcade.Sprite(tile_texture(level, gid), center_x=x, center_y=y))
+    return sprites
+
+
+class Chunk:
+    def __init__(self):
+        # Статичные тайлы грузятся в буфер видеокарты один раз и больше не меняются;
+        # анимированные лежат отдельно, чтобы смена кадра не трогала статичный буфер
+        self.static = arcade.SpriteList(lazy=True)
+        self.animated = arcade.SpriteList(lazy=True)
+
+
+class ChunkedLayer:
+    # Слой карты, разрезанный на квадраты по CHUNK_TILES тайлов. Рисуются и
+    # анимируются только чанки, попавшие в обзор камеры
+    def __init__(self, sprite_list, tile_size: int, chunk_tiles: int = CHUNK_TILES):
+        self.chunk_size = tile_size * chunk_tiles
+        self.chunks = {}
+        # Насколько тайл может выступать за свой чанк (он кладётся туда по центру)
+        self.margin = 0
+        for sprite in sprite_list:
+            self.margin = max(self.margin, sprite.width / 2, sprite.height / 2)
+            key = int(sprite.center_x // self.chunk_size), int(sprite.center_y // self.chunk_size)
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = Chunk()
+            if isinstance(sprite, arcade.TextureAnimationSprite):
+                chunk.animated.append(sprite)
+            else:
+                chunk.static.append(sprite)
+
+    def visible(self, camera: arcade.camera.Camera2D):
+        # left/right/bottom/top камеры — границы проекции относительно её центра, с учётом zoom
+        x, y = camera.position
+        x0 = int((x + camera.left - self.margin) // self.chunk_size)
+        x1 = int((x + camera.right + self.margin) // self.chunk_size)
+        y0 = int((y + camera.bottom - self.margin) // self.chunk_size)
+        y1 = int((y + camera.top + self.margin) // self.chunk_size)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                chunk = self.chunks.get((x, y))
+                if chunk is not None:
+                    yield chunk
+
+    def update_animation(self, dt: float, camera: arcade.camera.Camera2D) -> None:
+        for chunk in self.visible(camera):
+            chunk.animated.update_animation(dt)
+
+    def draw(self, camera: arcade.camera.Camera2D) -> None:
+        for chunk in self.visible(camera):
+            chunk.static.draw()
+            chunk.animated.draw()
@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from distance_field import load_field
+from level_cache import load_level
+from level_chunks import ChunkedLayer, layer_sprites
+from multiplayer import MultiSimulation
+from simulation import LAYERS, GOLD_TIME, SILVER_TIME, PHYSICS_RATE
+
+# Уровни в порядке выбора в меню: путь к карте и название. untitled_x/y/z.tmx
+# сюда не входят: их тайлсет ../../../Documents/was.tsx лежит вне репозитория
+# и финиша на них нет — вернуть, когда карты будут доделаны
+LEVELS = (
+    ("levels/untitled.tmx", "Трасса"),
+)
+
+
+class Level:
+    # Всё, что GameView нужно для заезда на карте: симуляция, слои для отрисовки
+    # и настройки. Точка старта, картинка дрона и время на кубки берутся из
+    # самой карты; рисуются все слои тайлов, кроме слоёв коллизий. Если время
+    # на кубки в карте не задано, оно считается по длине трассы из поля
+    # расстояний, по нему же GameView показывает прогресс
+    def __init__(self, path: str, title: str, rate: int = PHYSICS_RATE):
+        self.path = path
+        self.title = title
+        self.rate = rate
+        data = load_level(path)
+        self.sim = MultiSimulation(path, tick=1 / rate)
+        self.player_image = self.sim.player.image
+        self.width = data.width * data.tile_width
+        self.height = data.height * data.tile_height
+        self.field = load_field(path, data)
+        gold_time, silver_time = ((self.field.gold_time, self.field.silver_time) if self.field.reachable
+                                  else (GOLD_TIME, SILVER_TIME))
+        self.gold_time = float(data.properties.get("gold_time", gold_time))
+        self.silver_time = float(data.properties.get("silver_time", silver_time))
+        self.layers = [ChunkedLayer(layer_sprites(data, name), data.tile_width)
+                       for name in data.layers if name not in LAYERS]
+
+    # У первой трассы таблица прежняя, у остальных — своя на каждую карту
+    @property
+    def scores_path(self) -> str:
+        if self.path == LEVELS[0][0]:
+            return "scores.csv"
+        return f"scores_{Path(self.path).stem}.csv"
+
+
+class LevelRegistry:
+    # Загруженные уровни по номеру в LEVELS. Карта, сетка коллизий и спрайты
+    # собираются в фоновом потоке; prefetch ставит в очередь выбранный уровень
+    # и соседние, так что переключение между ними уже ничего не грузит.
+    # В видеокарту спрайты попадают при первой отрисовке (SpriteList lazy)
+    # rate — шагов физики в секунду у всех уровней
+    def __init__(self, levels=LEVELS, rate: int = PHYSICS_RATE):
+        self.levels = levels
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="levels")
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def title(self, index: int) -> str:
+        return self.levels[index % len(self.levels)][1]
+
+    def future(self, index: int):
+        index %= len(self.levels)
+        with self.lock:
+            future = self.futures.get(index)
+            if future is None:
+                future = self.futures[index] = self.executor.submit(Level, *self.levels[index], self.rate)
+            return future
+
+    def prefetch(self, index: int) -> None:
+        for i in (index, index + 1, index - 1):
+            self.future(i)
+
+    def ready(self, index: int) -> bool:
+        return self.future(index).done()
+
+    # Ждёт, только если уровень ещё не догрузился. Ошибку загрузки пробрасывает
+    # и забывает, чтобы исправленную карту можно было выбрать снова
+    def get(self, index: int) -> Level:
+        future = self.future(index)
+        try:
+            return future.result()
+        except Exception:
+            with self.lock:
+                if self.futures.get(index % len(self.levels)) is future:
+                    del self.futures[index % len(self.levels)]
+            raise
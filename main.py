@@ -1,30 +1,37 @@
-import math
+import startup  # Первым: от его импорта считается время запуска
+import argparse
 import sys
+from time import perf_counter_ns
 
 import arcade
 from arcade.gui import UIManager, UIAnchorLayout, UIBoxLayout, UIFlatButton, UIInputText, UILabel
 from pyglet.graphics import Batch
-from arcade.particles import FadeParticle, Emitter, EmitInterval
-import random
-from csv import reader, writer
+from datetime import datetime
+
+from assets import assets, PRELOAD
+from hud import GlyphText, seconds_to_str
+from leaderboard import Leaderboard
+from profiler import profiler
+from level_registry import LevelRegistry
+from replay import Replay, REPLAY_DIR, quantize, controls
+from particles import make_fountain
+from gamepad import Gamepads
+from mixer import mixer
+from simulation import PHYSICS_RATE
+
+startup.mark("imports")
 
 # Окно и цвета
 SCREEN_WIDTH, SCREEN_HEIGHT = 1920, 1080
 SCREEN_TITLE = "Clover sim"
-
-GRAVITY = 35 # 35
-
-LIN_AIR_DRAG = 0.9 # 0.9
-ANG_AIR_DRAG = 0.9
-GROUND_FRICTION = 14.0
-
-THRUST = 70 # 70
-ANG_THRUST = 1
-
-GRAB_RADIUS = 100
-BALL_ELASTICITY = 0.7 # 0.7
-BALL_STOP_BOUNCE = 2.1
-BALL_SLOW = 0.8
+# Больше этого за кадр физика не догоняет, чтобы после подвисания не уйти в спираль
+MAX_FRAME_TIME = 0.25
+# Стук мяча: не больше трёх сразу и не чаще раза в 30 мс — в углу мяч бьётся каждый шаг
+BOUNCE_VOICES = 3
+BOUNCE_INTERVAL = 0.03
+ARMED_LOOP_VOLUME = 0.2
+# Отсечки времени по пройденной мячом доле трассы
+SPLITS = (0.25, 0.5, 0.75)
 
 BUTTON_STYLE = {
         "normal": UIFlatButton.UIStyle(
@@ -62,56 +69,21 @@ BUTTON_STYLE = {
     }
 
 
-SILVER_TIME = 180
-GOLD_TIME = 120
-
-PUFF_TEX = arcade.make_soft_circle_texture(17, arcade.color.LIGHT_YELLOW, 255, 50)
-
-
-# Мутаторы (каждый кадр чуть-чуть меняют частицу)
-def gravity_drag(p):  # Для искр: чуть вниз и затухание скорости
-    p.change_y += -0.07
-    p.change_x *= 0.97
-    p.change_y *= 0.99
-
-def make_fountain(x, y):
-    # Фонтанчик: равномерный «дождик» вверх, бесконечно
-    return Emitter(
-        center_xy=(x, y),
-        emit_controller=EmitInterval(0.015),  # Непрерывный поток
-        particle_factory=lambda e: FadeParticle(
-            filename_or_texture=PUFF_TEX,
-            change_xy=(random.uniform(-6, 6), random.uniform(4.0, 6.0)),
-            center_xy=(random.uniform(-30, 30), 0),
-            lifetime=random.uniform(1.7, 2.5),
-            start_alpha=240, end_alpha=0,
-            scale=random.uniform(0.4, 0.8),
-            mutation_callback=gravity_drag,
-        ),
-    )
-
-
-def seconds_to_str(s: float):
-    minutes = str(int(s) // 60)
-    if len(minutes) == 0:
-        minutes = "00"
-    elif len(minutes) == 1:
-        minutes = "0" + minutes
-    seconds = int(s) % 60
-    if seconds == 0:
-        seconds = "00"
-    elif seconds < 10:
-        seconds = "0" + str(seconds)
-    ms = str(round(s % 1, 3))[2:]
-    return f"{minutes}:{seconds}.{ms}"
-
-
 class MenuView(arcade.View):
-    def __init__(self):
+    # rate — частота физики, с которой собираются уровни (--rate)
+    def __init__(self, rate: int = PHYSICS_RATE):
         super().__init__()
         self.background_color = arcade.color.BLUE_GRAY  # Фон для меню
-
-        self.game_view = GameView(self)
+        # Меню показывается сразу, а звуки, картинки и уровни грузятся в фоне:
+        # выбранный уровень и соседние с ним. GameView собирается при первом
+        # старте, когда всё нужное уже в памяти
+        assets.preload(PRELOAD)
+        self.levels = LevelRegistry(rate=rate)
+        self.level_index = 0
+        self.levels.prefetch(self.level_index)
+        self.game_view = None
+        self.starting = False  # Старт нажат до конца загрузки — начнётся сам
+        self.leaderboards = {}  # путь к таблице -> Leaderboard
 
         self.manager = UIManager()
         self.manager.enable()  # Включить, чтоб виджеты работали
@@ -123,6 +95,10 @@ class MenuView(arcade.View):
         flat_button = UIFlatButton(text="Начать игру", width=400, height=50, style=BUTTON_STYLE)
         flat_button.on_click = self.start  # Не только лямбду, конечно
         self.box_layout.add(flat_button)
+        self.level_button = UIFlatButton(text=self.level_text(), width=400, height=50, style=BUTTON_STYLE)
+        self.level_button.on_click = self.next_level
+        if len(self.levels) > 1:  # Выбирать не из чего — кнопку не показываем
+            self.box_layout.add(self.level_button)
         flat_button = UIFlatButton(text="Выйти", width=400, height=50, style=BUTTON_STYLE)
         flat_button.on_click = lambda _: sys.exit()  # Не только лямбду, конечно
         self.box_layout.add(flat_button)
@@ -134,6 +110,11 @@ class MenuView(arcade.View):
                         width=300,
                         align="center")
         self.box_layout.add(self.error_label)
+        self.loading_label = UILabel(font_size=16,
+                        text_color=arcade.color.WHITE,
+                        width=300,
+                        align="center")
+        self.box_layout.add(self.loading_label)
 
         self.anchor_layout.add(self.box_layout)  # Box в anchor
         self.manager.add(self.anchor_layout)  # Всё в manager
@@ -142,286 +123,361 @@ class MenuView(arcade.View):
     def on_draw(self) -> None:
         self.clear()
         self.manager.draw()
+        startup.mark("first_frame")
+
+    def on_update(self, dt: float) -> None:
+        done, total = self.loading()
+        text = "" if done == total else f"Загрузка {done}/{total}"
+        if self.loading_label.text != text:
+            self.loading_label.text = text
+        if self.starting and done == total:
+            self.start()
+
+    # Сколько из нужного для заезда уже загружено: ресурсы и выбранный уровень
+    def loading(self) -> tuple:
+        done, total = assets.progress(PRELOAD)
+        if done == total:
+            startup.mark("assets")
+        if self.levels.ready(self.level_index):
+            startup.mark("level")
+            done += 1
+        return done, total + 1
 
     def start(self, _=None) -> None:
-        if self.name:
-            self.game_view.name = self.name
-            self.error_label.text = ""
-            self.window.show_view(self.game_view)  # Переключаем
-        else:
+        if not self.name:
             self.error_label.text = "Введите имя"
+            return
+        done, total = self.loading()
+        self.starting = done < total
+        if self.starting:
+            self.error_label.text = ""
+            return
+        try:
+            level = self.levels.get(self.level_index)
+        except Exception:
+            self.error_label.text = "Уровень не загружается"
+            return
+        if self.game_view is None:
+            self.game_view = GameView(self, level)
+            startup.mark("game_view")
+        elif self.game_view.level is not level:
+            self.game_view.set_level(level)
+        elif self.game_view.sim.ended:
+            self.game_view.reset()  # Та же карта после финиша — заезд с начала
+        self.game_view.name = self.name
+        self.error_label.text = ""
+        self.window.show_view(self.game_view)  # Переключаем
+
+    def level_text(self) -> str:
+        return f"Уровень: {self.levels.title(self.level_index)}"
+
+    def next_level(self, _=None) -> None:
+        self.level_index = (self.level_index + 1) % len(self.levels)
+        self.levels.prefetch(self.level_index)
+        self.level_button.text = self.level_text()
+        self.error_label.text = ""
+
+    def leaderboard(self, level) -> Leaderboard:
+        board = self.leaderboards.get(level.scores_path)
+        if board is None:
+            board = self.leaderboards[level.scores_path] = Leaderboard(level.scores_path)
+        return board
 
     def update_name(self, event):
         self.name = event.new_value
 
 
+# Спрайты только рисуют — положение берётся из Simulation.
+# Дроны игроков после первого различаются цветом. Текстура дрона — картинка
+# уровня, её берёт и отпускает GameView.set_level, сам спрайт ничего не грузит
+PLAYER_COLORS = (arcade.color.WHITE, arcade.color.ORANGE, arcade.color.LIGHT_GREEN, arcade.color.PINK,
+                 arcade.color.YELLOW, arcade.color.LIGHT_BLUE, arcade.color.VIOLET, arcade.color.RED)
 class Player(arcade.Sprite):
-    def __init__(self):
-        super().__init__("images/player.png", center_x=96, center_y=100)
-        self.grounded = False
-
-    def update(self, dt: float = 1 / 60, *args, **kwargs) -> None:
-        self.change_angle += kwargs["roll"]
-        self.change_angle *= ANG_AIR_DRAG
-        self.angle += self.change_angle * dt
-        self.angle = self.angle % 360
-
-        angle = math.radians(self.angle)
-        self.change_x += math.sin(angle) * kwargs["acceleration"] * dt
-        self.change_y += math.cos(angle) * kwargs["acceleration"] * dt
-        self.change_y -= GRAVITY * dt
-        self.change_x -= LIN_AIR_DRAG * self.change_x * dt
-        self.change_y -= LIN_AIR_DRAG * self.change_y * dt
-        if self.grounded:
-            self.change_x -= GROUND_FRICTION * self.change_x * dt
-            self.change_y -= GROUND_FRICTION * self.change_y * dt
+    def __init__(self, texture=None):
+        super().__init__(texture, center_x=96, center_y=100)
 
 
 class Ball(arcade.Sprite):
     def __init__(self):
-        super().__init__("images/ball.png", center_x=96, center_y=100)
-
-    def update(self, dt: float = 1 / 60, *args, **kwargs) -> None:
-        self.change_y -= GRAVITY * dt
-        self.change_x -= LIN_AIR_DRAG * self.change_x * dt
-        self.change_y -= LIN_AIR_DRAG * self.change_y * dt
+        super().__init__(assets.acquire("images/ball.png"), center_x=96, center_y=100)
 
 
 class GameView(arcade.View):
-    def __init__(self, menu_view: MenuView):
+    def __init__(self, menu_view: MenuView, level):
         super().__init__()
 
         self.menu_view = menu_view
         self.pause_view = PauseView(self, menu_view)
 
-        joysticks = arcade.get_joysticks()
-
-        if joysticks:
-            self.joystick = joysticks[0]
-            self.joystick.open()
-        else:
-            self.joystick = None
+        self.gamepads = Gamepads()
+        self.open_joysticks()
 
-        self.armed_sound = arcade.load_sound("sounds/armed.wav")
-        self.armed_sound_loop = arcade.load_sound("sounds/armed_loop.wav")
-        self.fly_sound = arcade.load_sound("sounds/fly.wav")
-        self.bounce_sound = arcade.load_sound("sounds/bounce.wav")
+        self.armed_sound = assets.acquire("sounds/armed.wav")
+        self.armed_sound_loop = assets.acquire("sounds/armed_loop.wav")
+        self.fly_sound = assets.acquire("sounds/fly.wav")
+        self.bounce_sound = assets.acquire("sounds/bounce.wav")
+        mixer.configure(self.bounce_sound, BOUNCE_VOICES, BOUNCE_INTERVAL)
+        # Зацикленные звуки моторов живут всё время, пока жив GameView
+        self.fly_voice = mixer.loop(self.fly_sound, volume=0)
+        self.armed_loop_voice = mixer.loop(self.armed_sound_loop, volume=ARMED_LOOP_VOLUME)
 
+        # Спрайт на каждый дрон, self.player — первый
         self.player_list = arcade.SpriteList()
         self.player = Player()
         self.player_list.append(self.player)
+        self.players = [self.player]
 
         self.ball_list = arcade.SpriteList()
         self.ball = Ball()
         self.ball_list.append(self.ball)
-        self.ball_grabbed = False
-
-        tile_map = arcade.load_tilemap("levels/untitled.tmx", scaling=1, use_spatial_hash=True)
-        self.walls = tile_map.sprite_lists["walls"]
-        ball_solid = tile_map.sprite_lists["ball_solid"]
-        only_ball = tile_map.sprite_lists["only_ball"]
-        self.no_ball = tile_map.sprite_lists["no_ball"]
-        self.with_ball = tile_map.sprite_lists["with_ball"]
-        self.slow_ball = tile_map.sprite_lists["slow_ball"]
-        self.finish = tile_map.sprite_lists["finish"]
-        collision = tile_map.sprite_lists["collision"]
-        self.player_collision = arcade.SpriteList()
-        self.player_collision.extend(collision)
-        self.player_collision.extend(only_ball)
-        self.player_collision.extend(self.with_ball)
-        self.ball_collision = arcade.SpriteList()
-        self.ball_collision.extend(collision)
-        self.ball_collision.extend(ball_solid)
-
-        self.physics_engine = arcade.PhysicsEnginePlatformer(self.player, walls=self.player_collision, gravity_constant=0)
 
         self.batch = Batch()
         self.text_arm = arcade.Text(f"DISARMED",
                                      16, 1050, arcade.color.RED, 20, batch=self.batch)
-        self.text_timer = arcade.Text(f"00:00.00",
-                                    16, 16, arcade.color.WHITE, 20, batch=self.batch)
+        self.text_timer = GlyphText("00:00.000", 16, 16, arcade.color.WHITE, 20)
+        self.text_progress = arcade.Text("", 16, 50, arcade.color.WHITE, 16, batch=self.batch)
+
+        # F3 — оверлей профайлера, F4 — выгрузить замеры в profiles/
+        self.text_profile = arcade.Text("", SCREEN_WIDTH - 16, SCREEN_HEIGHT - 16, arcade.color.WHITE, 14,
+                                        anchor_x="right", anchor_y="top", multiline=True, width=420,
+                                        align="right", font_name="monospace")
+        self.profile_refresh = 0
 
         self.camera = arcade.camera.Camera2D()
         self.gui_camera = arcade.camera.Camera2D()
 
-        self.bg = arcade.load_texture("images/bg.jpeg")
-
-        self.fly_sound_player = arcade.play_sound(self.fly_sound, volume=0, loop=True)
+        self.bg = assets.acquire("images/bg.jpeg")
 
-        self.grounded = False
-        self.prev_btn_3 = False
-        self.armed = False
-        self.prev_btn_7 = False
-        self.timer = 0
-        self.started = False
-        self.ended = False
-        self.end_timer = 0
-        self.acceleration = 0
-        self.roll = 0
         self.name = ""
+        self.level = None
+        self.set_level(level)
+
+    # Другая карта: симуляция и спрайты уже собраны LevelRegistry, здесь только
+    # подмена ссылок, поэтому переключение ничего не грузит
+    def set_level(self, level) -> None:
+        if self.level is not None:
+            assets.release(self.level.player_image)
+        self.level = level
+        self.sim = level.sim
+        # Спрайты карты только рисуются, столкновения считает TileGrid
+        self.layers = level.layers
+        texture = assets.acquire(level.player_image)
+        for player in self.players:
+            player.texture = texture
+        self.reset()
+
+    # Свой джойстик у каждого дрона; без джойстиков — один дрон
+    def open_joysticks(self) -> None:
+        self.joysticks = arcade.get_joysticks()
+        self.gamepads.open(self.joysticks)
+
+    def sync_players(self) -> None:
+        players = max(len(self.joysticks), 1)
+        if players != len(self.sim.drones):
+            self.sim.set_players(players)
+        while len(self.players) < players:
+            player = Player(self.player.texture)
+            player.color = PLAYER_COLORS[len(self.players) % len(PLAYER_COLORS)]
+            self.players.append(player)
+            self.player_list.append(player)
+        while len(self.players) > players:
+            self.player_list.remove(self.players.pop())
+
+    # Новый заезд: звуки, текстуры, карта и PauseView остаются загруженными
+    def reset(self):
+        self.sync_players()
+        self.sim.reset()
+        self.end_timer = 0
 
-    def update_input(self):
-        if self.joystick.buttons[7] and not self.prev_btn_7:
-            self.armed = not self.armed
-        self.prev_btn_7 = self.joystick.buttons[7]
-        if self.armed:
-            acc_axis = (-self.joystick.y + 1) / 2
-            self.acceleration = acc_axis * THRUST
-            roll_axis = self.joystick.x
-            self.roll = roll_axis * ANG_THRUST
-            self.fly_sound_player.volume = max(0.1, min(acc_axis + abs(roll_axis), 0.7))
-            self.text_arm.text = ""
-        else:
-            self.acceleration = 0
-            self.roll = 0
-            self.fly_sound_player.volume = 0
-            self.text_arm.text = "DISARMED"
-
-    def update_player_grounded(self):
-        self.player.center_y += self.player.change_y - 1
-        if arcade.check_for_collision_with_list(self.player, self.player_collision):
-            self.player.grounded = True
-        else:
-            self.player.grounded = False
-        self.player.center_y -= self.player.change_y - 1
-
-    def update_ball_grabbed(self):
-        if (not self.prev_btn_3 and not self.ball_grabbed and self.joystick.buttons[3] and
-                (not arcade.check_for_collision_with_list(self.player, self.no_ball)) and
-                ((self.player.center_x - self.ball.center_x) ** 2 + (self.player.center_y - self.ball.center_y) ** 2) ** 0.5 < GRAB_RADIUS):
-            if not self.started and not self.ended:
-                self.started = True
-            self.ball_grabbed = True
-            for i in self.with_ball:
-                if i in self.player_collision:
-                    self.player_collision.remove(i)
-            for i in self.no_ball:
-                if i not in self.player_collision:
-                    self.player_collision.append(i)
-        elif self.ball_grabbed and not self.joystick.buttons[3]:
-            self.ball_grabbed = False
-            for i in self.with_ball:
-                if i not in self.player_collision:
-                    self.player_collision.append(i)
-            for i in self.no_ball:
-                if i in self.player_collision:
-                    self.player_collision.remove(i)
-            self.ball.change_x = self.player.change_x
-            self.ball.change_y = self.player.change_y
-        self.prev_btn_3 = self.joystick.buttons[3]
-
-    def update_ball_collision(self):
-        if arcade.check_for_collision_with_list(self.ball, self.slow_ball):
-            self.ball.change_x *= BALL_SLOW
-            self.ball.change_y *= BALL_SLOW
-
-        self.ball.center_x += self.ball.change_x
-        if arcade.check_for_collision_with_list(self.ball, self.ball_collision):
-            volume = min(abs(self.ball.change_x) * 0.01, 1)
-            if volume > 0.035:
-                arcade.play_sound(self.bounce_sound, volume=volume)
-            self.ball.center_x -= self.ball.change_x
-            self.ball.change_x = -self.ball.change_x * BALL_ELASTICITY
-            self.ball.center_x += self.ball.change_x
-            if arcade.check_for_collision_with_list(self.ball, self.ball_collision):
-                self.ball.change_x = 0
-                self.ball.center_x -= self.ball.change_x
-
-        self.ball.center_y += self.ball.change_y
-        if arcade.check_for_collision_with_list(self.ball, self.ball_collision):
-            volume = min(abs(self.ball.change_y) * 0.05, 1)
-            if volume > 0.035:
-                arcade.play_sound(self.bounce_sound, volume=volume)
-            self.ball.center_y -= self.ball.change_y
-            self.ball.change_y = -self.ball.change_y * BALL_ELASTICITY
-            if abs(self.ball.change_y) < BALL_STOP_BOUNCE:
-                self.ball.change_y = 0
-            self.ball.center_y += self.ball.change_y
-            if arcade.check_for_collision_with_list(self.ball, self.ball_collision):
-                self.ball.change_y = 0
-                self.ball.center_y -= self.ball.change_y
-
-    # Логика
+        # Несъеденный остаток времени кадра и состояние до последнего шага физики
+        self.accumulator = 0
+        self.previous = self.physics_state()
+        # Вход каждого шага физики пишется в реплей для проверки результата.
+        # Реплеи только одиночные: формат хранит вход одного джойстика
+        self.replay = Replay(level_path=self.level.path, rate=self.level.rate)
+
+        self.text_timer.set("00:00.000")
+        self.progress = 0.0
+        self.splits = []
+        self.shown_progress = None
+        self.text_progress.text = ""
+        self.shown_armed = None
+        self.sync_sprites()
+        self.update_camera()
+
+    def physics_state(self):
+        return [(drone.player.position, drone.player.angle) for drone in self.sim.drones], self.sim.ball.position
+
+    def update_input(self, acc_axis: float, roll_axis: float):
+        if self.sim.armed:
+            self.fly_voice.volume = max(0.1, min(acc_axis + abs(roll_axis), 0.7))
+        # Надпись и моторы — только при смене состояния
+        if self.sim.armed != self.shown_armed:
+            if self.sim.armed:
+                if self.shown_armed is False:  # Взвели, а не вернулись из паузы
+                    mixer.play(self.armed_sound)
+                self.fly_voice.play()
+                self.armed_loop_voice.play()
+            else:
+                self.fly_voice.pause()
+                self.armed_loop_voice.pause()
+            self.shown_armed = self.sim.armed
+            self.text_arm.text = "" if self.sim.armed else "DISARMED"
+
+    # Прогресс мяча — одно чтение клетки поля расстояний на шаг. Отсечка
+    # запоминается, когда мяч впервые проходит очередную долю трассы
+    def track_progress(self) -> None:
+        progress = self.level.field.progress(self.sim.ball.center_x, self.sim.ball.center_y)
+        if progress is None:
+            return  # Мяч в стене или поле без финиша — остаётся прежний
+        self.progress = progress
+        while len(self.splits) < len(SPLITS) and progress >= SPLITS[len(self.splits)]:
+            self.splits.append(self.sim.timer)
+
+    # Надпись меняется, только когда сменился целый процент или появилась отсечка
+    def update_progress_text(self) -> None:
+        shown = int(self.progress * 100), len(self.splits)
+        if shown != self.shown_progress:
+            self.shown_progress = shown
+            self.text_progress.text = "   ".join([f"{shown[0]}%"] + [f"{split * 100:.0f}%: {seconds_to_str(time)}"
+                                                                   for split, time in zip(SPLITS, self.splits)])
+
+    # alpha — доля шага между предыдущим и текущим состоянием физики
+    def sync_sprites(self, alpha: float = 1):
+        drones, (bx, by) = self.previous
+        for player, drone, ((px, py), angle) in zip(self.players, self.sim.drones, drones):
+            body = drone.player
+            player.position = (px + (body.center_x - px) * alpha, py + (body.center_y - py) * alpha)
+            player.angle = angle + ((body.angle - angle + 180) % 360 - 180) * alpha
+        self.ball.position = (bx + (self.sim.ball.center_x - bx) * alpha,
+                              by + (self.sim.ball.center_y - by) * alpha)
+
+    # Камера смотрит в середину между дронами
+    def update_camera(self):
+        x = sum(player.center_x for player in self.players) / len(self.players)
+        y = sum(player.center_y for player in self.players) / len(self.players)
+        self.camera.position = (max(SCREEN_WIDTH // 2, min(int(x), self.level.width - SCREEN_WIDTH // 2)),
+                                max(SCREEN_HEIGHT // 2, min(int(y), self.level.height - SCREEN_HEIGHT // 2)))
+
+    # Логика: физика идёт шагами sim.tick, сколько их набралось за кадр
     def on_update(self, dt: float) -> None:
-        self.update_input()
-
-        self.player.update(acceleration=self.acceleration, roll=self.roll)
-
-        self.update_player_grounded()
-
-        self.update_ball_grabbed()
-
-        self.physics_engine.update()
-
-        if self.ball_grabbed:
-            self.ball.center_x = self.player.center_x - math.sin(math.radians(self.player.angle)) * 24
-            self.ball.center_y = self.player.center_y - math.cos(math.radians(self.player.angle)) * 24
-        else:
-            self.ball.update()
-
-            self.update_ball_collision()
-
-        self.camera.position = (max(SCREEN_WIDTH // 2, min(int(self.player.center_x), 12000 - SCREEN_WIDTH // 2)),
-                                max(SCREEN_HEIGHT // 2, min(int(self.player.center_y), 4800 - SCREEN_HEIGHT // 2)))
-
-        if self.started:
-            self.timer += dt
-            minutes = str(int(self.timer) // 60)
-            if len(minutes) == 0:
-                minutes = "00"
-            elif len(minutes) == 1:
-                minutes = "0" + minutes
-            seconds = int(self.timer) % 60
-            if seconds == 0:
-                seconds = "00"
-            elif seconds < 10:
-                seconds = "0" + str(seconds)
-            ms = str(round(self.timer % 1, 3))[2:]
-            self.text_timer.text = f"{minutes}:{seconds}.{ms}"
-        if self.started and arcade.check_for_collision_with_list(self.ball, self.finish):
-            self.started = False
-            self.ended = True
-        if self.ended:
+        section = profiler.section
+        now = perf_counter_ns()
+        joystick_input = None
+        self.accumulator += min(dt, MAX_FRAME_TIME)
+        while self.accumulator >= self.sim.tick:
+            # Шаги, которые догоняют кадр, кончаются в прошлом — каждому достаются
+            # события джойстика до конца его собственного отрезка времени
+            with section("read_input"):
+                until = now - int((self.accumulator - self.sim.tick) * 1e9)
+                joystick_input = self.gamepads.read(until)
+            self.previous = self.physics_state()
+            # Пишется вход первого джойстика: после паузы джойстиков может
+            # стать больше, чем дронов, — лишние до нового заезда не участвуют
+            if len(self.sim.drones) == 1:
+                self.sim.step([self.replay.record(*joystick_input[0])])
+            else:
+                self.sim.step([controls(quantize(*raw)) for raw in joystick_input])
+            self.accumulator -= self.sim.tick
+            if self.sim.started:
+                with section("progress"):
+                    self.track_progress()
+
+            with section("sounds"):
+                for volume in self.sim.bounces:
+                    if volume > 0.035:
+                        mixer.play(self.bounce_sound, volume=volume)
+        # Моторы и надпись DISARMED — отдельно от стука мяча
+        with section("arm_state"):
+            if joystick_input is not None:
+                acc_axis, roll_axis, _, _ = controls(quantize(*joystick_input[0]))
+                self.update_input(acc_axis, roll_axis)
+
+        with section("camera"):
+            self.sync_sprites(self.accumulator / self.sim.tick)
+            self.update_camera()
+
+        with section("timer_text"):
+            if self.sim.started:
+                self.text_timer.set(seconds_to_str(self.sim.timer))
+                self.update_progress_text()
+        if self.sim.ended:
             self.end_timer += dt
             if self.end_timer > 3:
-                end_view = EndView(self.menu_view, self.timer, self.name)
+                if len(self.sim.drones) == 1:
+                    self.replay.name = self.name
+                    self.replay.time = self.sim.timer
+                    self.replay.save(REPLAY_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.clr")
+                end_view = EndView(self.menu_view, self.sim.timer, self.name, ranked=len(self.sim.drones) == 1)
                 self.window.show_view(end_view)
 
-        self.walls.update_animation(dt)
+        with section("animation"):
+            for layer in self.layers:
+                layer.update_animation(dt, self.camera)
+
+        if profiler.enabled:
+            self.profile_refresh -= dt
+            if self.profile_refresh <= 0:
+                self.profile_refresh = 0.5
+                # Одно присваивание — одна перекладка текста
+                rows = [f"{'мс':<12}{'p50':>7}{'p99':>8}"]
+                rows += [f"{name:<12}{p50:7.3f}{p99:8.3f}" for name, p50, p99 in profiler.percentiles()]
+                self.text_profile.text = "\n".join(rows)
 
     def on_draw(self) -> None:
-        self.clear()
-        sw = SCREEN_WIDTH // 2
-        x = max(sw, min(int(self.player.center_x), 12000 - sw))
-        scale = (self.bg.width * (SCREEN_HEIGHT / self.bg.height) // 2 - sw) / (sw - 6000)
-        background_x = (x - 6000) * scale + sw
-        arcade.draw_texture_rect(self.bg, arcade.rect.XYWH(background_x,
-                                                           SCREEN_HEIGHT // 2,
-                                                           self.bg.width * (SCREEN_HEIGHT / self.bg.height),
-                                                           SCREEN_HEIGHT))
-
-        self.camera.use()
-        self.walls.draw()
-        self.ball_list.draw()
-        self.player_list.draw()
-
-        self.gui_camera.use()
-        self.batch.draw()
+        section = profiler.section
+        with section("draw_bg"):
+            self.clear()
+            sw = SCREEN_WIDTH // 2
+            half = self.level.width / 2
+            x = self.camera.position[0]
+            # Карта не шире экрана — фону некуда ехать
+            scale = (self.bg.width * (SCREEN_HEIGHT / self.bg.height) // 2 - sw) / (sw - half) if half > sw else 0
+            background_x = (x - half) * scale + sw
+            arcade.draw_texture_rect(self.bg, arcade.rect.XYWH(background_x,
+                                                               SCREEN_HEIGHT // 2,
+                                                               self.bg.width * (SCREEN_HEIGHT / self.bg.height),
+                                                               SCREEN_HEIGHT))
+
+        with section("draw_level"):
+            self.camera.use()
+            for layer in self.layers:
+                layer.draw(self.camera)
+        with section("draw_sprites"):
+            self.ball_list.draw()
+            self.player_list.draw()
+
+        with section("draw_hud"):
+            self.gui_camera.use()
+            self.batch.draw()
+            self.text_timer.draw()
+        if profiler.enabled:
+            self.text_profile.draw()
+        profiler.end_frame()
+        if startup.enabled:
+            startup.mark("game_frame")
+            startup.report()
+            self.window.close()
 
     def on_key_press(self, key: int, modifiers: int) -> None:
         if key == arcade.key.ESCAPE:
             self.window.show_view(self.pause_view)
+        elif key == arcade.key.F3:
+            profiler.toggle()
+            self.text_profile.text = ""
+        elif key == arcade.key.F4:
+            profiler.export(f"{datetime.now():%Y%m%d-%H%M%S}")
 
     def on_show_view(self):
-        self.fly_sound_player = arcade.play_sound(self.fly_sound, volume=0, loop=True)
-        joysticks = arcade.get_joysticks()
-        self.joystick = joysticks[0] if joysticks else None
-        if self.joystick:
-            self.joystick.open()
+        self.open_joysticks()
+        self.shown_armed = None  # Моторы снова заведёт update_input
+        # Подключили или отключили джойстик — число дронов меняется с нового заезда
+        if max(len(self.joysticks), 1) != len(self.sim.drones) and not self.sim.started:
+            self.reset()
 
     def on_hide_view(self) -> None:
-        if self.fly_sound_player:
-            arcade.stop_sound(self.fly_sound_player)
+        mixer.pause()
+        self.gamepads.close()
 
 
 class PauseView(arcade.View):
@@ -463,68 +519,43 @@ class PauseView(arcade.View):
         self.window.show_view(self.game_view)
 
     def restart(self, _=None) -> None:
-        game_view = GameView(self.menu_view)
-        self.window.show_view(game_view)
+        self.game_view.reset()
+        self.window.show_view(self.game_view)
 
     def main_menu(self, _=None) -> None:
-        menu_view = MenuView()
-        self.window.show_view(menu_view)
+        self.game_view.reset()
+        self.window.show_view(self.menu_view)
 
 
 class EndView(arcade.View):
-    def __init__(self, menu_view: MenuView, time: float, name: str) -> None:
+    # ranked — результат идёт в таблицу. Заезды нескольких дронов не идут:
+    # реплея у них нет, и с одиночными они не сравнимы
+    def __init__(self, menu_view: MenuView, time: float, name: str, ranked: bool = True) -> None:
         super().__init__()
 
         self.menu_view = menu_view
         self.name = name
+        self.level = menu_view.game_view.level
+        self.gold_time = self.level.gold_time
+        self.silver_time = self.level.silver_time
+        self.leaderboard = menu_view.leaderboard(self.level)
 
-        self.gold_cup = arcade.load_texture("images/cup_gold.png")
-        self.silver_cup = arcade.load_texture("images/cup_silver.png")
-        self.bronze_cup = arcade.load_texture("images/cup_bronze.png")
+        self.gold_cup = assets.acquire("images/cup_gold.png")
+        self.silver_cup = assets.acquire("images/cup_silver.png")
+        self.bronze_cup = assets.acquire("images/cup_bronze.png")
 
         self.fountain = None
 
-        if time <= GOLD_TIME:
+        if time <= self.gold_time:
             self.trophy_texture = self.gold_cup
             self.fountain = make_fountain(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.7 + 100)
-        elif time <= SILVER_TIME:
+        elif time <= self.silver_time:
             self.trophy_texture = self.silver_cup
         else:
             self.trophy_texture = self.bronze_cup
 
-        score = [name, str(time)]
-
-        with open("scores.csv", "a+", newline="") as f:
-            f.seek(0)
-            scores = list(reader(f))
-
-        print(scores)
-
-        scores.append(score)
-        print(scores)
-        scores.sort(key=lambda x: float(x[1]))
-
-        print(scores)
-
-        with open("scores.csv", "w") as f:
-            w = writer(f)
-            w.writerows(scores)
-
-        top_scores = []
-        f = False
-        for i in range(len(scores)):
-            if scores[i] == score:
-                f = True
-                top_scores.append([i, *scores[i]])
-            else:
-                if len(top_scores) < 3:
-                    top_scores.append([i, *scores[i]])
-                elif f:
-                    top_scores.append([i, *scores[i]])
-            if len(top_scores) == 4:
-                break
-
-        top_scores_string = "\n".join([f"{i[0] + 1}) {i[1]}: {seconds_to_str(float(i[2]))}" for i in top_scores])
+        # Запись идёт в фоне, пока место не известно — заглушка
+        self.rank_future = self.leaderboard.submit(name, time) if ranked else None
 
         self.time = time
 
@@ -535,14 +566,19 @@ class EndView(arcade.View):
         self.anchor_layout = UIAnchorLayout()  # Центрирует виджеты
         self.box_layout = UIBoxLayout(vertical=True, space_between=10)  # Вертикальный стек
 
-        score_label = UILabel(text=top_scores_string, multiline=True)
-        self.box_layout.add(score_label)
+        self.score_label = UILabel(text="Сохраняем результат..." if ranked else "Заезд нескольких дронов в таблицу не идёт",
+                                   multiline=True, width=400)
+        self.box_layout.add(self.score_label)
         flat_button = UIFlatButton(text="Начать заново", width=400, height=50, style=BUTTON_STYLE)
         flat_button.on_click = self.restart  # Не только лямбду, конечно
         self.box_layout.add(flat_button)
         flat_button = UIFlatButton(text="Главное меню", width=400, height=50, style=BUTTON_STYLE)
         flat_button.on_click = self.main_menu  # Не только лямбду, конечно
         self.box_layout.add(flat_button)
+        if len(menu_view.levels) > 1:
+            flat_button = UIFlatButton(text="Следующий уровень", width=400, height=50, style=BUTTON_STYLE)
+            flat_button.on_click = self.next_level
+            self.box_layout.add(flat_button)
 
 
         self.anchor_layout.add(self.box_layout, align_y=-200)  # Box в anchor
@@ -566,7 +602,7 @@ class EndView(arcade.View):
                                           color=arcade.color.WHITE)
         arcade.draw_lbwh_rectangle_filled(SCREEN_WIDTH // 2 - 200,
                                           SCREEN_HEIGHT // 2 - 45,
-                                          min((400 * GOLD_TIME) / self.time, 400),
+                                          min((400 * self.gold_time) / self.time, 400),
                                           30,
                                           color=arcade.color.GREEN)
         arcade.draw_texture_rect(self.gold_cup, arcade.rect.XYWH(SCREEN_WIDTH // 2 + 200,
@@ -578,31 +614,67 @@ class EndView(arcade.View):
                                                                    30,
                                                                    30))
         arcade.draw_texture_rect(self.silver_cup,
-                                 arcade.rect.XYWH(SCREEN_WIDTH // 2 - 200 + (400 * GOLD_TIME // SILVER_TIME),
+                                 arcade.rect.XYWH(SCREEN_WIDTH // 2 - 200 + (400 * self.gold_time // self.silver_time),
                                                   SCREEN_HEIGHT // 2 - 70, 30, 30))
         self.manager.draw()
 
     def on_update(self, dt: float) -> bool | None:
         if self.fountain:
             self.fountain.update(dt)
+        if self.rank_future and self.rank_future.done():
+            self.show_scores()
+
+    def show_scores(self) -> None:
+        if self.rank_future.exception():
+            self.score_label.text = "Не удалось сохранить результат"
+        else:
+            top_scores = self.leaderboard.around(self.rank_future.result())
+            self.score_label.text = "\n".join([f"{i + 1}) {n}: {seconds_to_str(t)}" for i, n, t in top_scores])
+        self.rank_future = None
+
+    def on_hide_view(self) -> None:
+        for path in ("images/cup_gold.png", "images/cup_silver.png", "images/cup_bronze.png"):
+            assets.release(path)
 
     def main_menu(self, _=None) -> None:
-        self.menu_view.game_view = GameView(self.menu_view)
+        self.menu_view.game_view.reset()
         self.window.show_view(self.menu_view)
 
 
     def restart(self, _=None) -> None:
-        game_view = GameView(self.menu_view)
+        game_view = self.menu_view.game_view
+        game_view.reset()
         game_view.name = self.name
         self.window.show_view(game_view)
 
+    # Следующая карта обычно уже загружена в фоне, пока шёл заезд
+    def next_level(self, _=None) -> None:
+        self.menu_view.next_level()
+        self.menu_view.start()
+        if self.window.current_view is self:
+            self.window.show_view(self.menu_view)  # Догружается или не загрузилась — ждём в меню
+
 
 def main() -> None:
-    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, fullscreen=True)
-    menu_view = MenuView()
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--rate", type=int, default=PHYSICS_RATE,
+                        help=f"шагов физики в секунду (по умолчанию {PHYSICS_RATE}; 120 — вдвое чаще)")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="замерить запуск до первого кадра заезда и выйти")
+    args = parser.parse_args()
+
+    # Окно скрыто, пока не собрано меню, — без пустого чёрного кадра
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, fullscreen=True, visible=False)
+    startup.mark("window")
+    menu_view = MenuView(args.rate)
     window.show_view(menu_view)
+    startup.mark("menu")
+    window.set_visible(True)
+    if args.startup_time:
+        startup.enabled = True
+        menu_view.name = "startup"
+        menu_view.start()
     arcade.run()
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import time
+
+import pyglet
+
+VOICES = 8
+
+
+class Voice:
+    # Один плеер pyglet на всё время игры. sound — что в нём сейчас заряжено
+    __slots__ = ("player", "sound", "started")
+
+    def __init__(self):
+        self.player = pyglet.media.Player()
+        self.sound = None
+        self.started = 0.0
+
+    @property
+    def playing(self) -> bool:
+        return self.player.playing
+
+    @property
+    def volume(self) -> float:
+        return self.player.volume
+
+    @volume.setter
+    def volume(self, value: float) -> None:
+        self.player.volume = value
+
+    def load(self, sound) -> None:
+        player = self.player
+        if self.sound is not sound:
+            while player.source is not None:
+                player.next_source()
+            self.sound = sound
+        # Доигравший звук pyglet снимает с плеера — ставим заново, иначе с начала
+        if player.source is None:
+            player.queue(sound.source)
+        else:
+            player.seek(0)
+
+    def play(self) -> None:
+        self.player.play()
+
+    def pause(self) -> None:
+        self.player.pause()
+
+
+class Mixer:
+    # Все звуки игры играют на voices заранее созданных плеерах — arcade.play_sound
+    # заводил бы новый на каждый удар мяча. Для звука можно задать limit — сколько
+    # его копий звучит одновременно (лишняя забирает самую старую) — и interval —
+    # чаще этого звук не перезапускается, повтор только делает громче текущий.
+    # Если свободных плееров нет, забирается самый давно начатый.
+    # Плееры создаются при первом звуке, а не при импорте, чтобы не тормозить запуск
+    def __init__(self, voices: int = VOICES):
+        self.size = voices
+        self.voices = []
+        self.limits = {}  # звук -> (limit, interval)
+        self.last = {}  # звук -> последний запущенный Voice
+        self.loops = {}  # звук -> Voice
+
+    def configure(self, sound, limit: int = VOICES, interval: float = 0.0) -> None:
+        self.limits[sound] = limit, interval
+
+    def play(self, sound, volume: float = 1.0):
+        if not self.voices:
+            self.voices = [Voice() for _ in range(self.size)]
+        now = time.perf_counter()
+        limit, interval = self.limits.get(sound, (self.size, 0.0))
+        last = self.last.get(sound)
+        if last is not None and last.sound is sound and now - last.started < interval:
+            if last.playing and volume > last.volume:
+                last.volume = volume
+            return None
+
+        copies = 0
+        oldest_copy = free = oldest = None
+        for voice in self.voices:
+            if voice.playing:
+                if voice.sound is sound:
+                    copies += 1
+                    if oldest_copy is None or voice.started < oldest_copy.started:
+                        oldest_copy = voice
+                if oldest is None or voice.started < oldest.started:
+                    oldest = voice
+            elif free is None or (voice.sound is sound and free.sound is not sound):
+                free = voice
+        if copies >= limit:
+            voice = oldest_copy
+        else:
+            voice = free or oldest
+
+        voice.load(sound)
+        voice.volume = volume
+        voice.started = now
+        voice.play()
+        self.last[sound] = voice
+        return voice
+
+    # Зацикленный звук: по своему плееру на звук, вне общего набора, создаётся
+    # один раз. Стоит на паузе, пока не вызовут play
+    def loop(self, sound, volume: float = 1.0) -> Voice:
+        voice = self.loops.get(sound)
+        if voice is None:
+            voice = self.loops[sound] = Voice()
+            voice.player.loop = True
+            voice.load(sound)
+        voice.volume = volume
+        return voice
+
+    def pause(self) -> None:
+        for voice in self.voices:
+            voice.pause()
+        for voice in self.loops.values():
+            voice.pause()
+
+
+mixer = Mixer()
@@ -0,0 +1,297 @@
+import math
+import struct
+
+from profiler import profiler
+from simulation import (Simulation, PlayerBody, LEVEL_PATH, TICK, FREE_COLLISION, CARRY_COLLISION, BALL_ELASTICITY)
+
+# Несколько дронов на одной карте и один мяч. Физика каждого дрона — та же, что
+# в Simulation: перед его половиной шага состояние дрона подставляется в поля
+# Simulation (player, armed, ...), после — забирается обратно. Мяч, карта,
+# таймер и финиш общие и считаются один раз за шаг.
+DRONE_STATE = ("player", "player_collision", "armed", "prev_arm", "prev_grab", "player_hits")
+DRONE_ELASTICITY = 0.5
+IDLE = (0.0, 0.0, False, False)
+
+# Снимок состояния для передачи по сети: заголовок, мяч и по записи на дрона.
+# float32 хватает для отрисовки, сервер считает в float64 и снимки только отдаёт.
+# Кроме координат в снимке всё, от чего зависит следующий шаг: кто нёс мяч
+# последним и были ли нажаты кнопки (нажатие считается по фронту). Маска
+# коллизий дрона из снимка выводится: CARRY_COLLISION только у того, кто с мячом
+HEAD = struct.Struct("<IfBbbB")  # шаг, таймер, флаги, у кого мяч и кто нёс последним (-1 — никто), число дронов
+BALL = struct.Struct("<ffff")  # x, y, скорость x, y
+DRONE = struct.Struct("<ffffffB")  # x, y, угол, скорость x, y, угловая, флаги
+STARTED, ENDED = 1, 2
+ARMED, GROUNDED, PREV_ARM, PREV_GRAB = 1, 2, 4, 8
+CHECK_TICKS = 600
+DELTA_MASK = struct.Struct("<I")  # бит на запись: 0 — заголовок, 1 — мяч, 2.. — дроны
+
+
+class Drone:
+    __slots__ = DRONE_STATE
+
+    def __init__(self, player: PlayerBody):
+        self.player = player
+        self.reset()
+
+    def reset(self) -> None:
+        self.player.reset()
+        self.player_collision = FREE_COLLISION
+        self.armed = False
+        self.prev_arm = False
+        self.prev_grab = False
+        self.player_hits = 0
+
+
+class MultiSimulation(Simulation):
+    # players дронов, вход — по кортежу аргументов Simulation.step на дрона.
+    # Дроны толкают друг друга и (если их больше одного) свободный мяч; с одним
+    # дроном шаг совпадает с Simulation бит в бит, так что реплеи и таблица
+    # результатов одиночной игры не меняются. После шага поля Simulation
+    # (player, armed, ...) снова указывают на первого дрона
+    def __init__(self, level_path: str = LEVEL_PATH, players: int = 1, swept_ball: bool = False, tick: float = TICK):
+        self.drones = []
+        super().__init__(level_path, swept_ball, tick)
+        self.drones = [Drone(self.player)]
+        self.drone = self.drones[0]
+        self.set_players(players)
+
+    def set_players(self, players: int) -> None:
+        players = max(players, 1)
+        while len(self.drones) < players:
+            self.drones.append(Drone(PlayerBody(self.player.image, self.spawn)))
+        del self.drones[players:]
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        for drone in self.drones:
+            drone.reset()
+        self.carrier = None  # Дрон с мячом
+        self.finisher = None  # Кто последним нёс мяч — он и довёз его до финиша
+        if self.drones:
+            self.use(self.drones[0])
+
+    def use(self, drone: Drone) -> None:
+        for name in DRONE_STATE:
+            setattr(self, name, getattr(drone, name))
+        self.drone = drone
+        self.ball_grabbed = self.carrier is drone
+
+    def store(self, drone: Drone) -> None:
+        for name in DRONE_STATE:
+            setattr(drone, name, getattr(self, name))
+
+    def update_ball_grabbed(self, grab: bool):
+        # Мяч у другого дрона — отобрать нельзя
+        if self.carrier is not None and self.carrier is not self.drone:
+            self.prev_grab = grab
+            return
+        super().update_ball_grabbed(grab)
+        if self.ball_grabbed:
+            self.carrier = self.finisher = self.drone
+        else:
+            self.carrier = None
+
+    def step(self, inputs=()) -> None:
+        self.bounces.clear()
+        for i, drone in enumerate(self.drones):
+            self.use(drone)
+            self.step_player(*(inputs[i] if i < len(inputs) else IDLE))
+            self.store(drone)
+
+        if len(self.drones) > 1:
+            with profiler.section("drones"):
+                self.collide_drones()
+                self.collide_ball()
+
+        self.use(self.carrier or self.drones[0])
+        self.step_world()
+        self.use(self.drones[0])
+
+    # Дроны — круги по меньшей стороне хитбокса. Каждый отодвигается на половину
+    # перекрытия, если там свободно, скорости вдоль линии центров гасятся ударом
+    def collide_drones(self) -> None:
+        drones = self.drones
+        for i in range(len(drones)):
+            a = drones[i].player
+            for j in range(i + 1, len(drones)):
+                b = drones[j].player
+                dx, dy = b.center_x - a.center_x, b.center_y - a.center_y
+                reach = (min(a.width, a.height) + min(b.width, b.height)) / 2
+                distance = math.hypot(dx, dy)
+                if distance >= reach:
+                    continue
+                nx, ny = (dx / distance, dy / distance) if distance else (1.0, 0.0)
+                push = (reach - distance) / 2
+                self.nudge(drones[i], -nx * push, -ny * push)
+                self.nudge(drones[j], nx * push, ny * push)
+                approach = (a.change_x - b.change_x) * nx + (a.change_y - b.change_y) * ny
+                if approach > 0:
+                    impulse = (1 + DRONE_ELASTICITY) * approach / 2
+                    a.change_x -= impulse * nx
+                    a.change_y -= impulse * ny
+                    b.change_x += impulse * nx
+                    b.change_y += impulse * ny
+
+    def nudge(self, drone: Drone, dx: float, dy: float) -> None:
+        body = drone.player
+        body.center_x += dx
+        body.center_y += dy
+        if self.collides(body, drone.player_collision):
+            body.center_x -= dx
+            body.center_y -= dy
+
+    # Свободный мяч отскакивает от дронов, как от стены, но с учётом их скорости
+    def collide_ball(self) -> None:
+        if self.carrier is not None:
+            return
+        ball = self.ball
+        radius = min(ball.width, ball.height) / 2
+        for drone in self.drones:
+            body = drone.player
+            dx, dy = ball.center_x - body.center_x, ball.center_y - body.center_y
+            reach = radius + min(body.width, body.height) / 2
+            distance = math.hypot(dx, dy)
+            if distance >= reach:
+                continue
+            nx, ny = (dx / distance, dy / distance) if distance else (0.0, 1.0)
+            push = reach - distance
+            ball.center_x += nx * push
+            ball.center_y += ny * push
+            if self.collides(ball, self.ball_collision):
+                ball.center_x -= nx * push
+                ball.center_y -= ny * push
+            approach = (ball.change_x - body.change_x) * nx + (ball.change_y - body.change_y) * ny
+            if approach < 0:
+                ball.change_x -= (1 + BALL_ELASTICITY) * approach * nx
+                ball.change_y -= (1 + BALL_ELASTICITY) * approach * ny
+                self.bounces.append(min(-approach * 0.05, 1))
+
+    def snapshot(self) -> bytes:
+        index = {drone: i for i, drone in enumerate(self.drones)}
+        ball = self.ball
+        parts = [HEAD.pack(self.ticks, self.timer, self.started * STARTED | self.ended * ENDED,
+                           index.get(self.carrier, -1), index.get(self.finisher, -1), len(self.drones)),
+                 BALL.pack(ball.center_x, ball.center_y, ball.change_x, ball.change_y)]
+        for drone in self.drones:
+            body = drone.player
+            parts.append(DRONE.pack(body.center_x, body.center_y, body.angle,
+                                    body.change_x, body.change_y, body.change_angle,
+                                    drone.armed * ARMED | body.grounded * GROUNDED |
+                                    drone.prev_arm * PREV_ARM | drone.prev_grab * PREV_GRAB))
+        return b"".join(parts)
+
+    # Принять снимок сервера: число дронов подгоняется
+    def restore(self, data: bytes) -> None:
+        ticks, timer, flags, carrier, finisher, players = HEAD.unpack_from(data)
+        if players != len(self.drones):
+            self.set_players(players)
+        self.ticks, self.timer = ticks, timer
+        self.started, self.ended = bool(flags & STARTED), bool(flags & ENDED)
+        self.carrier = self.drones[carrier] if carrier >= 0 else None
+        self.finisher = self.drones[finisher] if finisher >= 0 else None
+        ball = self.ball
+        ball.center_x, ball.center_y, ball.change_x, ball.change_y = BALL.unpack_from(data, HEAD.size)
+        for i, drone in enumerate(self.drones):
+            body = drone.player
+            (body.center_x, body.center_y, body.angle, body.change_x, body.change_y, body.change_angle,
+             flags) = DRONE.unpack_from(data, HEAD.size + BALL.size + i * DRONE.size)
+            drone.armed = bool(flags & ARMED)
+            body.grounded = bool(flags & GROUNDED)
+            drone.prev_arm = bool(flags & PREV_ARM)
+            drone.prev_grab = bool(flags & PREV_GRAB)
+            drone.player_collision = CARRY_COLLISION if drone is self.carrier else FREE_COLLISION
+        self.use(self.drones[0])
+
+
+def records(data: bytes) -> list:
+    offset = HEAD.size + BALL.size
+    return [data[:HEAD.size], data[HEAD.size:offset]] + [data[i:i + DRONE.size]
+                                                          for i in range(offset, len(data), DRONE.size)]
+
+
+# Разница двух снимков: маска поменявшихся записей и сами эти записи. Стоящий
+# на месте дрон не стоит ничего, заголовок с номером шага меняется всегда
+def encode_delta(previous: bytes, current: bytes) -> bytes:
+    old, new = records(previous), records(current)
+    mask = 0
+    changed = []
+    for i, record in enumerate(new):
+        if i >= len(old) or old[i] != record:
+            mask |= 1 << i
+            changed.append(record)
+    return DELTA_MASK.pack(mask) + b"".join(changed)
+
+
+def apply_delta(previous: bytes, delta: bytes) -> bytes:
+    mask, = DELTA_MASK.unpack_from(delta)
+    offset = DELTA_MASK.size
+    # Число дронов — в заголовке, он тоже мог прийти в разнице
+    if mask & 1:
+        head = delta[offset:offset + HEAD.size]
+    else:
+        head = previous[:HEAD.size]
+    players = HEAD.unpack(head)[-1]
+    old = records(previous)
+    result = []
+    for i, size in enumerate([HEAD.size, BALL.size] + [DRONE.size] * players):
+        if mask >> i & 1:
+            result.append(delta[offset:offset + size])
+            offset += size
+        else:
+            result.append(old[i])
+    return b"".join(result)
+
+
+# Вход для проверки: газ и крен плавно гуляют, захват держится и отпускается
+# каждые 40 шагов, взведение нажато на шагах 2–5 — снимки попадают и на
+# удержание кнопок, и на перенос мяча
+def check_input(tick: int, i: int):
+    acceleration = 0.55 + 0.25 * math.sin(tick * 0.03 + i)
+    roll = 0.6 * math.sin(tick * 0.05 + i)
+    return acceleration, roll, (tick // 40 + i) % 3 != 2, 2 <= tick <= 5
+
+
+# float32, как в снимке, — только для check_restore
+def round32(value: float) -> float:
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+# Снимок -> restore -> шаги должны давать то же, что у исходной симуляции.
+# Свежая симуляция собирается только из снимка, а у исходной до float32
+# округляются лишь числа, которые снимок хранит; остальное состояние (кнопки,
+# маски, кто с мячом) у неё своё. Если что-то, от чего зависит шаг, в снимок
+# не попало, пути разойдутся. Возвращает номер шага расхождения или None
+def check_restore(level_path: str = LEVEL_PATH, players: int = 2, ticks: int = CHECK_TICKS, every: int = 7):
+    sim = MultiSimulation(level_path, players)
+    copy = MultiSimulation(level_path, players)
+
+    def state(s):
+        return (s.snapshot(), s.finisher and s.drones.index(s.finisher),
+                [(drone.player_collision, drone.prev_arm, drone.prev_grab) for drone in s.drones], s.ball_grabbed)
+
+    for tick in range(ticks):
+        if tick % every == 0:
+            copy.restore(sim.snapshot())
+            sim.timer = round32(sim.timer)
+            for body in [sim.ball] + [drone.player for drone in sim.drones]:
+                for name in ("center_x", "center_y", "change_x", "change_y", "angle", "change_angle"):
+                    setattr(body, name, round32(getattr(body, name)))
+        inputs = [check_input(tick, i) for i in range(players)]
+        sim.step(inputs)
+        copy.step(inputs)
+        if state(sim) != state(copy):
+            return tick
+    return None
+
+
+# python multiplayer.py — проверить, что снимок переносит всё состояние шага
+if __name__ == "__main__":
+    import sys
+
+    failed = False
+    for count in (1, 2, 3):
+        tick = check_restore(players=count)
+        print(f"{count} дрон(а): {'ок' if tick is None else f'расхождение на шаге {tick}'}")
+        failed |= tick is not None
+    sys.exit(1 if failed else 0)
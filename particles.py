@@ -0,0 +1,180 @@
+import arcade
+import numpy as np
+from arcade.gl import BufferDescription
+from pyglet import gl
+
+# Частицы пачкой: состояние всех частиц — массивы numpy фиксированного размера,
+# обновляются одной операцией на поле, мёртвые слоты переиспользуются. Рисуются
+# точками одним вызовом: живые частицы копируются в буфер видеокарты, круг с
+# мягким краем дорисовывает шейдер, так что спрайтов и текстур на частицу нет
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_pos;
+in float in_size;
+in float in_alpha;
+out float v_alpha;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_pos, 0.0, 1.0);
+    gl_PointSize = in_size;
+    v_alpha = in_alpha;
+}
+"""
+
+# Как make_soft_circle_texture: прозрачность от center_alpha в центре до
+# outer_alpha на краю, снаружи пусто
+FRAGMENT_SHADER = """
+#version 330
+
+uniform vec3 color;
+uniform float center_alpha;
+uniform float outer_alpha;
+in float v_alpha;
+out vec4 fragColor;
+
+void main() {
+    float r = length(gl_PointCoord * 2.0 - 1.0);
+    if (r > 1.0) discard;
+    fragColor = vec4(color, mix(center_alpha, outer_alpha, r) * v_alpha);
+}
+"""
+
+
+class ParticlePool:
+    # capacity — сколько частиц живёт одновременно, лишние не рождаются.
+    # Скорость в пикселях за кадр при 60 к/с, как у частиц arcade; gravity и
+    # drag тоже на кадр: каждый кадр change_y -= gravity, скорость *= drag
+    def __init__(self, capacity: int, color=arcade.color.WHITE, diameter: float = 17,
+                 gravity: float = 0.0, drag=(1.0, 1.0), start_alpha: int = 255, end_alpha: int = 0,
+                 center_alpha: int = 255, outer_alpha: int = 0):
+        self.capacity = capacity
+        self.diameter = diameter
+        self.gravity = gravity
+        self.drag = np.array(drag, dtype=np.float32)
+        self.start_alpha = start_alpha / 255
+        self.end_alpha = end_alpha / 255
+
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.ones(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+
+        # x, y, размер, прозрачность — ровно то, что уходит в буфер
+        self.vertices = np.zeros((capacity, 4), dtype=np.float32)
+        self.rendered = 0
+        self.geometry = None
+        self.color = color
+        self.center_alpha = center_alpha / 255
+        self.outer_alpha = outer_alpha / 255
+
+    def __len__(self) -> int:
+        return self.count
+
+    # Родить частицы: x, y, vx, vy, lifetime, scale — числа или массивы длины n
+    def emit(self, n: int, x, y, vx, vy, lifetime, scale) -> None:
+        free = np.flatnonzero(~self.alive)[:n]
+        n = len(free)
+        if not n:
+            return
+        self.pos[free, 0] = x if np.isscalar(x) else x[:n]
+        self.pos[free, 1] = y if np.isscalar(y) else y[:n]
+        self.vel[free, 0] = vx if np.isscalar(vx) else vx[:n]
+        self.vel[free, 1] = vy if np.isscalar(vy) else vy[:n]
+        self.lifetime[free] = lifetime if np.isscalar(lifetime) else lifetime[:n]
+        self.size[free] = self.diameter * (scale if np.isscalar(scale) else scale[:n])
+        self.age[free] = 0
+        self.alive[free] = True
+        self.count += n
+
+    def update(self, dt: float) -> None:
+        if not self.count:
+            self.rendered = 0
+            return
+        alive = self.alive
+        # Мёртвые слоты тоже считаются — дешевле, чем выбирать живые
+        self.pos += self.vel * (dt * 60)
+        self.vel[:, 1] -= self.gravity
+        self.vel *= self.drag
+        self.age += dt
+        alive &= self.age < self.lifetime
+        self.count = int(np.count_nonzero(alive))
+
+        n = self.count
+        t = self.age[alive] / self.lifetime[alive]
+        self.vertices[:n, :2] = self.pos[alive]
+        self.vertices[:n, 2] = self.size[alive]
+        self.vertices[:n, 3] = np.clip(self.start_alpha + (self.end_alpha - self.start_alpha) * t, 0, 1)
+        self.rendered = n
+
+    def clear(self) -> None:
+        self.alive[:] = False
+        self.count = 0
+        self.rendered = 0
+
+    def create_geometry(self, ctx) -> None:
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        self.program["color"] = tuple(c / 255 for c in self.color[:3])
+        self.program["center_alpha"] = self.center_alpha
+        self.program["outer_alpha"] = self.outer_alpha
+        self.buffer = ctx.buffer(reserve=self.vertices.nbytes)
+        self.geometry = ctx.geometry([BufferDescription(self.buffer, "2f 1f 1f", ["in_pos", "in_size", "in_alpha"])],
+                                     mode=ctx.POINTS)
+
+    def draw(self) -> None:
+        if not self.rendered:
+            return
+        ctx = arcade.get_window().ctx
+        if self.geometry is None:
+            self.create_geometry(ctx)
+        self.buffer.write(self.vertices[:self.rendered].tobytes())
+        with ctx.enabled(ctx.BLEND, gl.GL_PROGRAM_POINT_SIZE):
+            self.geometry.render(self.program, vertices=self.rendered)
+
+
+class Fountain:
+    # Равномерный «дождик» вверх из полосы шириной 2 * spread: одна частица
+    # каждые interval секунд, остаток времени переносится на следующий кадр
+    def __init__(self, x: float, y: float, pool: ParticlePool, interval: float = 0.015, spread: float = 30,
+                 speed_x=(-6, 6), speed_y=(4.0, 6.0), lifetime=(1.7, 2.5), scale=(0.4, 0.8)):
+        self.x = x
+        self.y = y
+        self.pool = pool
+        self.interval = interval
+        self.spread = spread
+        self.speed_x = speed_x
+        self.speed_y = speed_y
+        self.lifetime = lifetime
+        self.scale = scale
+        self.carry = 0.0
+        self.rng = np.random.default_rng()
+
+    def update(self, dt: float) -> None:
+        self.carry += dt
+        n = int(self.carry / self.interval)
+        self.carry -= n * self.interval
+        if n:
+            uniform = self.rng.uniform
+            self.pool.emit(n, self.x + uniform(-self.spread, self.spread, n), self.y,
+                           uniform(*self.speed_x, n), uniform(*self.speed_y, n),
+                           uniform(*self.lifetime, n), uniform(*self.scale, n))
+        self.pool.update(dt)
+
+    def draw(self) -> None:
+        self.pool.draw()
+
+
+# Искры кубка: чуть вниз и затухание скорости. 2.5 с жизни по 15 мс — до 167
+# частиц сразу, запас на длинные кадры
+def make_fountain(x, y):
+    pool = ParticlePool(256, arcade.color.LIGHT_YELLOW, diameter=17, gravity=0.07, drag=(0.97, 0.99),
+                        start_alpha=240, end_alpha=0, center_alpha=255, outer_alpha=50)
+    return Fountain(x, y, pool)
@@ -0,0 +1,99 @@
+import json
+from collections import deque
+from contextlib import nullcontext
+from csv import writer
+from pathlib import Path
+from time import perf_counter_ns
+
+PROFILE_DIR = Path("profiles")
+NULL_SECTION = nullcontext()
+
+
+class Section:
+    # Один объект на имя, чтобы на горячем пути ничего не создавалось
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+
+    def __exit__(self, *_):
+        self.profiler.add(self.name, self.start, perf_counter_ns())
+
+
+class FrameProfiler:
+    # Время подсистем за кадр: with profiler.section("ball"): ...
+    # Хранит последние window кадров для p50/p99 и, пока включён, события для
+    # экспорта в CSV или Chrome trace (chrome://tracing, ui.perfetto.dev).
+    # Выключенный профайлер отдаёт пустой контекст и почти ничего не стоит
+    def __init__(self, window: int = 300, max_events: int = 200_000):
+        self.enabled = False
+        self.window = window
+        self.sections = {}
+        self.frame = {}
+        self.history = {}  # имя -> deque мс по кадрам
+        self.events = deque(maxlen=max_events)  # (кадр, имя, начало нс, конец нс)
+        self.frames = 0
+
+    def section(self, name: str):
+        if not self.enabled:
+            return NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+        return section
+
+    def add(self, name: str, start: int, end: int) -> None:
+        self.frame[name] = self.frame.get(name, 0) + end - start
+        self.events.append((self.frames, name, start, end))
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        for name in self.frame:
+            if name not in self.history:
+                self.history[name] = deque([0.0] * min(self.frames, self.window), maxlen=self.window)
+        for name, values in self.history.items():
+            values.append(self.frame.get(name, 0) / 1e6)
+        self.frame = {}
+        self.frames += 1
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        self.frame = {}
+
+    # [(имя, p50 мс, p99 мс)] по последним кадрам
+    def percentiles(self) -> list:
+        result = []
+        for name, values in self.history.items():
+            ordered = sorted(values)
+            if ordered:
+                result.append((name, ordered[len(ordered) // 2], ordered[min(len(ordered) * 99 // 100, len(ordered) - 1)]))
+        return result
+
+    def export_csv(self, path) -> None:
+        with open(path, "w", newline="") as f:
+            w = writer(f)
+            w.writerow(["frame", "section", "start_us", "duration_us"])
+            for frame, name, start, end in self.events:
+                w.writerow([frame, name, start // 1000, (end - start) / 1000])
+
+    def export_chrome_trace(self, path) -> None:
+        events = [{"name": name, "cat": "frame", "ph": "X", "pid": 0, "tid": 0,
+                   "ts": start / 1000, "dur": (end - start) / 1000, "args": {"frame": frame}}
+                  for frame, name, start, end in self.events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    # Оба файла в profiles/, имя — по времени
+    def export(self, stamp: str) -> None:
+        PROFILE_DIR.mkdir(exist_ok=True)
+        self.export_csv(PROFILE_DIR / f"{stamp}.csv")
+        self.export_chrome_trace(PROFILE_DIR / f"{stamp}.json")
+
+
+profiler = FrameProfiler()
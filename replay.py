@@ -0,0 +1,145 @@
+import math
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from simulation import Simulation, LEVEL_PATH, PHYSICS_RATE
+
+# Реплей — это вход джойстика на каждый шаг физики. Физика детерминирована,
+# так что по нему заезд пересчитывается без окна и сверяется заявленное время.
+#
+# Файл: заголовок, имя игрока и путь уровня (utf-8 с длиной), потом сжатые
+# zlib кадры по 5 байт: оси x, y в int16 и кнопки битами.
+MAGIC = b"CLRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBHId")  # магия, версия, частота физики, число кадров, время
+FRAME = struct.Struct("<hhB")
+AXIS_SCALE = 32767
+GRAB_BUTTON = 1  # кнопка 3 джойстика
+ARM_BUTTON = 2  # кнопка 7 джойстика
+REPLAY_DIR = Path("replays")
+
+
+def pack_string(text: str) -> bytes:
+    data = text.encode()
+    return struct.pack("<H", len(data)) + data
+
+
+def unpack_string(data: bytes, offset: int):
+    size, = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return data[offset:offset + size].decode(), offset + size
+
+
+# Игра тоже управляется округлёнными осями, иначе пересчёт разойдётся
+def quantize(x: float, y: float, grab: bool, arm: bool):
+    x = round(max(-1.0, min(x, 1.0)) * AXIS_SCALE)
+    y = round(max(-1.0, min(y, 1.0)) * AXIS_SCALE)
+    return x, y, (GRAB_BUTTON if grab else 0) | (ARM_BUTTON if arm else 0)
+
+
+# Кадр реплея -> аргументы Simulation.step
+def controls(frame):
+    x, y, buttons = frame
+    acceleration = (-y / AXIS_SCALE + 1) / 2
+    roll = x / AXIS_SCALE
+    return acceleration, roll, bool(buttons & GRAB_BUTTON), bool(buttons & ARM_BUTTON)
+
+
+class Replay:
+    def __init__(self, name: str = "", level_path: str = LEVEL_PATH, rate: int = PHYSICS_RATE):
+        self.name = name
+        self.level_path = level_path
+        self.rate = rate
+        self.time = 0.0
+        self.frames = []
+
+    # Записать вход одного шага и вернуть то, что надо отдать в Simulation.step
+    def record(self, x: float, y: float, grab: bool, arm: bool):
+        frame = quantize(x, y, grab, arm)
+        self.frames.append(frame)
+        return controls(frame)
+
+    def to_bytes(self) -> bytes:
+        header = HEADER.pack(MAGIC, VERSION, self.rate, len(self.frames), self.time)
+        frames = b"".join(FRAME.pack(*frame) for frame in self.frames)
+        return header + pack_string(self.name) + pack_string(self.level_path) + zlib.compress(frames, 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        if len(data) < HEADER.size:
+            raise ValueError("Не файл реплея: слишком короткий")
+        magic, version, rate, count, finish_time = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Не файл реплея или неизвестная версия")
+        name, offset = unpack_string(data, HEADER.size)
+        level_path, offset = unpack_string(data, offset)
+        frames = zlib.decompress(data[offset:])
+        if len(frames) != count * FRAME.size:
+            raise ValueError("Реплей обрезан")
+
+        replay = cls(name, level_path, rate)
+        replay.time = finish_time
+        replay.frames = list(FRAME.iter_unpack(frames))
+        return replay
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> "Replay":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+# Прогнать реплей до финиша или до конца записи. sim можно передать готовый —
+# при проверке пачки реплеев карта разбирается один раз
+def simulate(replay: Replay, sim: Simulation | None = None) -> Simulation:
+    if sim is None:
+        sim = Simulation(replay.level_path, tick=1 / replay.rate)
+    else:
+        sim.reset()
+    for frame in replay.frames:
+        sim.step(*controls(frame))
+        if sim.ended:
+            break
+    return sim
+
+
+def verify(replay: Replay, sim: Simulation | None = None) -> bool:
+    sim = simulate(replay, sim)
+    return sim.ended and math.isclose(sim.timer, replay.time, abs_tol=sim.tick / 2)
+
+
+# python replay.py replays/*.clr — проверить все реплеи и вывести результат
+def main(paths) -> int:
+    sims = {}
+    failed = 0
+    for path in paths:
+        # Битый файл или пропавшая карта — не повод бросать проверку остальных
+        try:
+            replay = Replay.load(path)
+            key = replay.level_path, replay.rate
+            if key not in sims:
+                sims[key] = Simulation(replay.level_path, tick=1 / replay.rate)
+        except (OSError, struct.error, zlib.error, ValueError) as e:
+            failed += 1
+            print(f"FAIL {path}: не читается: {e}")
+            continue
+        sim = sims[key]
+
+        start = time.perf_counter()
+        ok = verify(replay, sim)
+        elapsed = time.perf_counter() - start
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {path}: {replay.name} заявлено {replay.time:.3f} с, "
+              f"посчитано {sim.timer:.3f} с, финиш {sim.ended}, "
+              f"{sim.ticks / max(elapsed, 1e-9):.0f} шагов/с")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
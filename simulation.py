@@ -0,0 +1,613 @@
+import math
+
+import numpy as np
+
+from assets import assets
+from level_cache import LevelData, load_level, GID_MASK
+from profiler import profiler
+
+# Физика. Всё, что ниже, не требует окна, OpenGL-контекста, джойстика и звуков,
+# поэтому Simulation можно гонять без экрана: на CI, для реплеев и подбора констант.
+GRAVITY = 35 # 35
+
+LIN_AIR_DRAG = 0.9 # 0.9
+ANG_AIR_DRAG = 0.9
+GROUND_FRICTION = 14.0
+
+THRUST = 70 # 70
+ANG_THRUST = 1
+
+GRAB_RADIUS = 100
+BALL_ELASTICITY = 0.7 # 0.7
+BALL_STOP_BOUNCE = 2.1
+BALL_SLOW = 0.8
+
+# Время на кубки, с
+SILVER_TIME = 180
+GOLD_TIME = 120
+
+# Физика идёт фиксированными шагами, независимо от частоты кадров. Скорости
+# хранятся в пикселях за 1/60 с, как в исходной версии, поэтому при 60 Гц шаг
+# совпадает со старым покадровым обновлением бит в бит.
+PHYSICS_RATE = 60
+TICK = 1 / PHYSICS_RATE
+BASE_TICK = 1 / 60
+
+LEVEL_PATH = "levels/untitled.tmx"
+PLAYER_IMAGE = "images/player.png"
+BALL_IMAGE = "images/ball.png"
+SPAWN = (96, 100)
+SWEEP_EPSILON = 1e-9
+# Вершина хитбокса считается внутри клетки, если до её края больше этой доли
+# клетки, — ошибка округления в проверке по осям на много порядков меньше
+VERTEX_MARGIN = 1e-6
+
+
+class Shape:
+    # Выпуклый хитбокс, повёрнутый на угол (по часовой, как у спрайтов arcade).
+    # Координаты относительно центра. Проекции на нормали рёбер считаются лениво:
+    # большинство проверок заканчивается на габаритах, до тайлов дело не доходит.
+    def __init__(self, points, angle: float = 0):
+        rad = math.radians(angle)
+        c, s = math.cos(rad), math.sin(rad)
+        self.points = [(x * c + y * s, -x * s + y * c) for x, y in points]
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+        self._axes = None
+
+    @property
+    def axes(self) -> list:
+        if self._axes is None:
+            points = self.points
+            self._axes = []
+            for i, (x1, y1) in enumerate(points):
+                x2, y2 = points[i - 1]
+                nx, ny = y1 - y2, x2 - x1
+                proj = [x * nx + y * ny for x, y in points]
+                self._axes.append((nx, ny, min(proj), max(proj)))
+        return self._axes
+
+    def hits_box(self, cx: float, cy: float, x0: float, y0: float, x1: float, y1: float) -> bool:
+        # Теорема о разделяющей оси: оси тайла — это габариты хитбокса, дальше нормали рёбер.
+        # Касание считается пересечением — так же, как в arcade.
+        if cx + self.max_x < x0 or x1 < cx + self.min_x or cy + self.max_y < y0 or y1 < cy + self.min_y:
+            return False
+        for nx, ny, lo, hi in self.axes:
+            offset = cx * nx + cy * ny
+            a, b = x0 * nx, x1 * nx
+            c, d = y0 * ny, y1 * ny
+            box_lo = (a if a < b else b) + (c if c < d else d)
+            box_hi = (b if a < b else a) + (d if c < d else c)
+            if hi + offset < box_lo or box_hi < lo + offset:
+                return False
+        return True
+
+
+class Body:
+    def __init__(self, image: str, center_x: float, center_y: float):
+        # От картинки нужны только хитбокс и размеры — сама текстура не держится
+        texture = assets.acquire(image)
+        self.hit_box_points = texture.hit_box_points
+        self.width = texture.width
+        self.height = texture.height
+        assets.release(image)
+        self._shape = Shape(self.hit_box_points)
+        self._shape_angle = 0.0
+        self.start = center_x, center_y
+        self.reset()
+
+    def reset(self) -> None:
+        self.center_x, self.center_y = self.start
+        self.change_x = 0.0
+        self.change_y = 0.0
+        self.angle = 0.0
+        self.change_angle = 0.0
+
+    @property
+    def shape(self) -> Shape:
+        if self.angle != self._shape_angle:
+            self._shape = Shape(self.hit_box_points, self.angle)
+            self._shape_angle = self.angle
+        return self._shape
+
+    @property
+    def position(self):
+        return self.center_x, self.center_y
+
+
+class PlayerBody(Body):
+    def __init__(self, image: str = PLAYER_IMAGE, spawn=SPAWN):
+        self.image = image
+        super().__init__(image, *spawn)
+
+    def reset(self) -> None:
+        super().reset()
+        self.grounded = False
+
+    def update(self, dt: float = 1 / 60, acceleration: float = 0, roll: float = 0) -> None:
+        steps = dt / BASE_TICK
+        self.change_angle += roll * steps
+        self.change_angle *= ANG_AIR_DRAG ** steps
+        self.angle += self.change_angle * dt
+        self.angle = self.angle % 360
+
+        angle = math.radians(self.angle)
+        self.change_x += math.sin(angle) * acceleration * dt
+        self.change_y += math.cos(angle) * acceleration * dt
+        self.change_y -= GRAVITY * dt
+        self.change_x -= LIN_AIR_DRAG * self.change_x * dt
+        self.change_y -= LIN_AIR_DRAG * self.change_y * dt
+        if self.grounded:
+            self.change_x -= GROUND_FRICTION * self.change_x * dt
+            self.change_y -= GROUND_FRICTION * self.change_y * dt
+
+
+class BallBody(Body):
+    def __init__(self, spawn=SPAWN):
+        super().__init__(BALL_IMAGE, *spawn)
+
+    def update(self, dt: float = 1 / 60) -> None:
+        self.change_y -= GRAVITY * dt
+        self.change_x -= LIN_AIR_DRAG * self.change_x * dt
+        self.change_y -= LIN_AIR_DRAG * self.change_y * dt
+
+
+# Слои карты, которые участвуют в коллизиях, и их биты в TileGrid.cells
+LAYERS = ("collision", "ball_solid", "only_ball", "no_ball", "with_ball", "slow_ball", "finish")
+COLLISION, BALL_SOLID, ONLY_BALL, NO_BALL, WITH_BALL, SLOW_BALL, FINISH = (1 << i for i in range(len(LAYERS)))
+
+# Наборы слоёв, в которые упирается дрон, — готовые маски. Захват и отпускание
+# мяча меняют одно число: PLAYER_COLLISION[ball_grabbed]
+FREE_COLLISION = COLLISION | ONLY_BALL | WITH_BALL
+CARRY_COLLISION = COLLISION | ONLY_BALL | NO_BALL
+PLAYER_COLLISION = (FREE_COLLISION, CARRY_COLLISION)
+BALL_COLLISION = COLLISION | BALL_SOLID
+
+
+class TileGrid:
+    # Карта коллизий: один байт на клетку, в нём по биту на каждый слой из LAYERS.
+    # Строки хранятся снизу вверх — как y в arcade. Все тайлы коллизий в smbu.tsx —
+    # полные квадраты, поэтому запрос к карте — это чтение клеток под габаритами
+    # хитбокса, и только на занятых клетках нужна точная проверка.
+    def __init__(self, path: str = LEVEL_PATH, level: LevelData = None):
+        if level is None:
+            level = load_level(path)
+        self.width = level.width
+        self.height = level.height
+        self.tile_size = level.tile_width
+        cells = np.zeros((self.height, self.width), dtype=np.uint8)
+        for bit, name in enumerate(LAYERS):
+            if name in level.layers:
+                cells |= ((level.layers[name] & GID_MASK) != 0).astype(np.uint8) << bit
+        # В TMX строки сверху вниз, в сетке — снизу вверх
+        self.cells = bytearray(cells[::-1].tobytes())
+        self.last_vertex = 0  # См. vertex_inside
+
+    def span(self, shape: Shape, cx: float, cy: float):
+        # Диапазоны клеток, которых касаются габариты хитбокса, обрезанные по карте
+        size = self.tile_size
+        c0 = math.ceil((cx + shape.min_x) / size) - 1
+        c1 = math.floor((cx + shape.max_x) / size) + 1
+        r0 = math.ceil((cy + shape.min_y) / size) - 1
+        r1 = math.floor((cy + shape.max_y) / size) + 1
+        return (range(c0 if c0 > 0 else 0, c1 if c1 < self.width else self.width),
+                range(r0 if r0 > 0 else 0, r1 if r1 < self.height else self.height))
+
+    def hits(self, shape: Shape, cx: float, cy: float, mask: int) -> list:
+        size = self.tile_size
+        cells = self.cells
+        cols, rows = self.span(shape, cx, cy)
+        result = []
+        for row in rows:
+            start = row * self.width
+            y0 = row * size
+            for col in cols:
+                if cells[start + col] & mask:
+                    x0 = col * size
+                    if shape.hits_box(cx, cy, x0, y0, x0 + size, y0 + size):
+                        result.append((col, row))
+        return result
+
+    def collides(self, body: Body, mask: int) -> bool:
+        # То же, что hits, но до первого пересечения — это самый горячий вызов
+        # симуляции, поэтому span и hits_box развёрнуты прямо здесь: те же
+        # выражения в том же порядке, результат совпадает бит в бит
+        shape = body.shape
+        cx, cy = body.center_x, body.center_y
+        size = self.tile_size
+        width = self.width
+        left, right = cx + shape.min_x, cx + shape.max_x
+        bottom, top = cy + shape.min_y, cy + shape.max_y
+        c0 = math.ceil(left / size) - 1
+        c1 = math.floor(right / size) + 1
+        r0 = math.ceil(bottom / size) - 1
+        r1 = math.floor(top / size) + 1
+        if c0 < 0:
+            c0 = 0
+        if c1 > width:
+            c1 = width
+        cells = self.cells
+        axes = None
+        for row in range(r0 if r0 > 0 else 0, r1 if r1 < self.height else self.height):
+            y0 = row * size
+            y1 = y0 + size
+            if top < y0 or y1 < bottom:
+                continue
+            start = row * width
+            for col, cell in enumerate(cells[start + c0:start + c1], c0):
+                if not cell & mask:
+                    continue
+                x0 = col * size
+                x1 = x0 + size
+                if right < x0 or x1 < left:
+                    continue
+                if axes is None:
+                    # Вершина хитбокса внутри занятой клетки — пересечение есть
+                    # наверняка, и проверка по осям его только подтвердит
+                    if self.vertex_inside(shape, cx, cy, mask):
+                        return True
+                    # Сдвиг проекций хитбокса от клетки не зависит
+                    axes = []
+                    for nx, ny, lo, hi in shape.axes:
+                        offset = cx * nx + cy * ny
+                        axes.append((nx, ny, lo + offset, hi + offset))
+                for nx, ny, lo, hi in axes:
+                    a, b = x0 * nx, x1 * nx
+                    c, d = y0 * ny, y1 * ny
+                    box_lo = (a if a < b else b) + (c if c < d else d)
+                    box_hi = (b if a < b else a) + (d if c < d else c)
+                    if hi < box_lo or box_hi < lo:
+                        break
+                else:
+                    return True
+        return False
+
+    def vertex_inside(self, shape: Shape, cx: float, cy: float, mask: int) -> bool:
+        size = self.tile_size
+        width, height = self.width, self.height
+        cells = self.cells
+        lo, hi = VERTEX_MARGIN * size, (1 - VERTEX_MARGIN) * size
+        # Первой проверяется вершина, которая попала в клетку в прошлый раз:
+        # обычно дрон упирается в стену или пол одним и тем же углом
+        points = shape.points
+        first = self.last_vertex % len(points)
+        for i in range(first, first + len(points)):
+            x, y = points[i % len(points)]
+            x += cx
+            y += cy
+            col = int(x // size)
+            row = int(y // size)
+            if (0 <= col < width and 0 <= row < height and cells[row * width + col] & mask and
+                    lo < x % size < hi and lo < y % size < hi):
+                self.last_vertex = i
+                return True
+        return False
+
+    def sweep(self, shape: Shape, cx: float, cy: float, dx: float, dy: float, mask: int):
+        # Габариты хитбокса, сдвигаемые на (dx, dy), против занятых клеток.
+        # Возвращает (t, ось нормали "x"/"y") для первого удара на отрезке [0, 1)
+        # или None. Клетки, с которыми габариты уже пересекаются, пропускаются —
+        # касание ударом не считается, иначе мяч залипал бы на полу и у стен.
+        size = self.tile_size
+        left, right = cx + shape.min_x, cx + shape.max_x
+        bottom, top = cy + shape.min_y, cy + shape.max_y
+        c0 = max(math.floor((min(left, left + dx)) / size), 0)
+        c1 = min(math.ceil((max(right, right + dx)) / size), self.width)
+        r0 = max(math.floor((min(bottom, bottom + dy)) / size), 0)
+        r1 = min(math.ceil((max(top, top + dy)) / size), self.height)
+        best = None
+        for row in range(r0, r1):
+            start = row * self.width
+            y0, y1 = row * size, row * size + size
+            if dy > 0:
+                ty_in, ty_out = (y0 - top) / dy, (y1 - bottom) / dy
+            elif dy < 0:
+                ty_in, ty_out = (y1 - bottom) / dy, (y0 - top) / dy
+            elif bottom < y1 and top > y0:
+                ty_in, ty_out = -math.inf, math.inf
+            else:
+                continue
+            for col in range(c0, c1):
+                if not self.cells[start + col] & mask:
+                    continue
+                x0, x1 = col * size, col * size + size
+                if dx > 0:
+                    tx_in, tx_out = (x0 - right) / dx, (x1 - left) / dx
+                elif dx < 0:
+                    tx_in, tx_out = (x1 - left) / dx, (x0 - right) / dx
+                elif left < x1 and right > x0:
+                    tx_in, tx_out = -math.inf, math.inf
+                else:
+                    continue
+                t_in = tx_in if tx_in > ty_in else ty_in
+                t_out = tx_out if tx_out < ty_out else ty_out
+                # Небольшой допуск на погрешность: после удара мяч стоит вплотную к клетке
+                if t_in >= t_out or t_in < -SWEEP_EPSILON or t_in >= 1:
+                    continue
+                if best is None or t_in < best[0]:
+                    best = (max(t_in, 0.0), "x" if tx_in > ty_in else "y")
+        return best
+
+
+class Simulation:
+    # Вся игровая логика одного заезда: дрон, мяч, слои коллизий и таймер.
+    # Вход подаётся явно на каждый шаг, поэтому GameView, реплеи и бенчмарки
+    # крутят одну и ту же физику.
+    # swept_ball — непрерывная коллизия мяча (см. sweep_ball_collision) вместо
+    # проверки пересечения после сдвига на целый шаг; tick — длина шага физики.
+    # Точка старта — объект spawn на карте, картинка дрона — свойство карты player
+    def __init__(self, level_path: str = LEVEL_PATH, swept_ball: bool = False, tick: float = TICK):
+        level = load_level(level_path)
+        self.level = TileGrid(level_path, level)
+        self.spawn = level.objects.get("spawn", SPAWN)
+        self.swept_ball = swept_ball
+        self.tick = tick
+        # Во сколько раз шаг длиннее исходного кадра 1/60 с
+        self.scale = tick / BASE_TICK
+        self.ball_collision = BALL_COLLISION
+        self.player = PlayerBody(level.properties.get("player", PLAYER_IMAGE), self.spawn)
+        self.ball = BallBody(self.spawn)
+        self.reset()
+
+    # Новый заезд на той же карте — уровень и хитбоксы загружать заново не нужно
+    def reset(self) -> None:
+        self.player_collision = FREE_COLLISION
+
+        self.player.reset()
+        self.ball.reset()
+        self.ball_grabbed = False
+
+        self.prev_grab = False
+        self.armed = False
+        self.prev_arm = False
+        self.timer = 0
+        self.started = False
+        self.ended = False
+        self.ticks = 0
+        # Сколько раз дрон упёрся в стену или пол (для подбора констант)
+        self.player_hits = 0
+        # Громкости ударов мяча за последний шаг — звук играет тот, кто рисует
+        self.bounces = []
+
+    def collides(self, body: Body, mask: int) -> bool:
+        return self.level.collides(body, mask)
+
+    def update_input(self, arm: bool) -> None:
+        if arm and not self.prev_arm:
+            self.armed = not self.armed
+        self.prev_arm = arm
+
+    def update_player_grounded(self):
+        probe = self.player.change_y * self.scale - 1
+        self.player.center_y += probe
+        self.player.grounded = self.collides(self.player, self.player_collision)
+        self.player.center_y -= probe
+
+    def update_ball_grabbed(self, grab: bool):
+        if (not self.prev_grab and not self.ball_grabbed and grab and
+                (not self.collides(self.player, NO_BALL)) and
+                ((self.player.center_x - self.ball.center_x) ** 2 + (self.player.center_y - self.ball.center_y) ** 2) ** 0.5 < GRAB_RADIUS):
+            if not self.started and not self.ended:
+                self.started = True
+            self.ball_grabbed = True
+            self.player_collision = CARRY_COLLISION
+        elif self.ball_grabbed and not grab:
+            self.ball_grabbed = False
+            self.player_collision = FREE_COLLISION
+            self.ball.change_x = self.player.change_x
+            self.ball.change_y = self.player.change_y
+        self.prev_grab = grab
+
+    def wiggle_until_free(self, body: Body, mask: int) -> None:
+        # Перебор точек вокруг центра с растущим шагом, как в arcade
+        o_x, o_y = body.position
+        wiggle_distance = 1
+        while True:
+            for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                body.center_x = o_x + dx * wiggle_distance
+                body.center_y = o_y + dy * wiggle_distance
+                if not self.collides(body, mask):
+                    return
+            wiggle_distance *= 2
+
+    def move_player(self) -> None:
+        # Повторяет PhysicsEnginePlatformer.update (_move_sprite с ramp_up),
+        # но проверяет пересечения по сетке тайлов, а не по спрайтам
+        player = self.player
+        mask = self.player_collision
+        change_x = player.change_x * self.scale
+        change_y = player.change_y * self.scale
+        change_angle = player.change_angle * self.scale
+        if self.collides(player, mask):
+            self.wiggle_until_free(player, mask)
+
+        original_x, original_y = player.position
+        original_angle = player.angle
+
+        if change_angle:
+            player.angle += change_angle
+            if self.collides(player, mask):
+                max_distance = (player.width + player.height) / 2
+                self.wiggle_until_free(player, mask)
+                if math.dist((original_x, original_y), player.position) > max_distance:
+                    player.center_x, player.center_y = original_x, original_y
+                    player.angle = original_angle
+
+        player.center_y += change_y
+        hit_list = self.level.hits(player.shape, player.center_x, player.center_y, mask)
+        if hit_list:
+            if change_y > 0:
+                while self.collides(player, mask):
+                    player.center_y -= 1
+            elif change_y < 0:
+                size = self.level.tile_size
+                shape = player.shape
+                for col, row in hit_list:
+                    x0, y0 = col * size, row * size
+                    while shape.hits_box(player.center_x, player.center_y, x0, y0, x0 + size, y0 + size):
+                        player.center_y += 0.25
+            player.change_y = 0.0
+            self.player_hits += 1
+        player.center_y = round(player.center_y, 2)
+
+        if change_x:
+            almost_original_y = player.center_y
+            direction = math.copysign(1, change_x)
+            cur_x_change = abs(change_x)
+            upper_bound = cur_x_change
+            lower_bound = 0
+            cur_y_change = 0
+
+            exit_loop = False
+            while not exit_loop:
+                player.center_x = original_x + cur_x_change * direction
+                collision = self.collides(player, mask)
+                if collision:
+                    # Можно ли заехать наверх по ступеньке
+                    cur_y_change = cur_x_change
+                    player.center_y = original_y + cur_y_change
+                    collision = self.collides(player, mask)
+                    if collision:
+                        cur_y_change -= cur_x_change
+                    else:
+                        while not collision and cur_y_change > 0:
+                            cur_y_change -= 1
+                            player.center_y = almost_original_y + cur_y_change
+                            collision = self.collides(player, mask)
+                        cur_y_change += 1
+                        collision = False
+
+                    if collision:
+                        upper_bound = cur_x_change - 1
+                        if upper_bound - lower_bound <= 0:
+                            cur_x_change = lower_bound
+                            exit_loop = True
+                        else:
+                            cur_x_change = (upper_bound + lower_bound) // 2
+                    else:
+                        exit_loop = True
+                else:
+                    lower_bound = cur_x_change
+                    if upper_bound - lower_bound <= 0:
+                        exit_loop = True
+                    else:
+                        cur_x_change = (upper_bound + lower_bound) // 2 + (upper_bound + lower_bound) % 2
+
+            player.center_x = original_x + cur_x_change * direction
+            player.center_y = almost_original_y + cur_y_change
+            if cur_x_change < abs(change_x):
+                self.player_hits += 1
+
+    def slow_down_ball(self):
+        if self.collides(self.ball, SLOW_BALL):
+            slow = BALL_SLOW ** self.scale
+            self.ball.change_x *= slow
+            self.ball.change_y *= slow
+
+    def update_ball_collision(self):
+        scale = self.scale
+        self.ball.center_x += self.ball.change_x * scale
+        if self.collides(self.ball, self.ball_collision):
+            self.bounces.append(min(abs(self.ball.change_x) * 0.01, 1))
+            self.ball.center_x -= self.ball.change_x * scale
+            self.ball.change_x = -self.ball.change_x * BALL_ELASTICITY
+            self.ball.center_x += self.ball.change_x * scale
+            if self.collides(self.ball, self.ball_collision):
+                self.ball.change_x = 0
+
+        self.ball.center_y += self.ball.change_y * scale
+        if self.collides(self.ball, self.ball_collision):
+            self.bounces.append(min(abs(self.ball.change_y) * 0.05, 1))
+            self.ball.center_y -= self.ball.change_y * scale
+            self.ball.change_y = -self.ball.change_y * BALL_ELASTICITY
+            if abs(self.ball.change_y) < BALL_STOP_BOUNCE:
+                self.ball.change_y = 0
+            self.ball.center_y += self.ball.change_y * scale
+            if self.collides(self.ball, self.ball_collision):
+                self.ball.change_y = 0
+
+    def sweep_ball_collision(self, dx: float, dy: float, max_hits: int = 4):
+        # Мяч проходит путь (dx, dy) по кусочкам: до точного момента удара, там
+        # отражается по нормали с потерей скорости и идёт дальше с остатком пути.
+        # Так он не проскакивает тонкие стены на любой скорости и любом шаге.
+        ball = self.ball
+        shape = ball.shape
+        for _ in range(max_hits):
+            hit = self.level.sweep(shape, ball.center_x, ball.center_y, dx, dy, self.ball_collision)
+            if hit is None:
+                break
+            t, axis = hit
+            ball.center_x += dx * t
+            ball.center_y += dy * t
+            dx *= 1 - t
+            dy *= 1 - t
+            if axis == "x":
+                self.bounces.append(min(abs(ball.change_x) * 0.01, 1))
+                ball.change_x = -ball.change_x * BALL_ELASTICITY
+                dx = -dx * BALL_ELASTICITY
+            else:
+                self.bounces.append(min(abs(ball.change_y) * 0.05, 1))
+                ball.change_y = -ball.change_y * BALL_ELASTICITY
+                dy = -dy * BALL_ELASTICITY
+                if abs(ball.change_y) < BALL_STOP_BOUNCE:
+                    ball.change_y = 0
+                    dy = 0
+        else:
+            # Застряли в углу — остаток пути не проходим
+            return
+        ball.center_x += dx
+        ball.center_y += dy
+
+    # acceleration — ось газа 0..1, roll — ось крена -1..1,
+    # grab и arm — состояние кнопок (3 и 7 на геймпаде)
+    def step(self, acceleration: float = 0, roll: float = 0, grab: bool = False, arm: bool = False) -> None:
+        self.bounces.clear()
+        self.step_player(acceleration, roll, grab, arm)
+        self.step_world()
+
+    # Половина шага, которая касается только дрона: ввод, полёт, захват мяча
+    def step_player(self, acceleration: float, roll: float, grab: bool, arm: bool) -> None:
+        section = profiler.section
+        with section("input"):
+            self.update_input(arm)
+            if not self.armed:
+                acceleration = 0
+                roll = 0
+
+        with section("player"):
+            self.player.update(self.tick, acceleration=acceleration * THRUST, roll=roll * ANG_THRUST)
+
+        with section("grounded"):
+            self.update_player_grounded()
+
+        with section("grab"):
+            self.update_ball_grabbed(grab)
+
+        with section("move"):
+            self.move_player()
+
+    # Общая половина: мяч, финиш и таймер
+    def step_world(self) -> None:
+        section = profiler.section
+        with section("ball"):
+            if self.ball_grabbed:
+                self.ball.center_x = self.player.center_x - math.sin(math.radians(self.player.angle)) * 24
+                self.ball.center_y = self.player.center_y - math.cos(math.radians(self.player.angle)) * 24
+            else:
+                self.ball.update(self.tick)
+
+                self.slow_down_ball()
+                if self.swept_ball:
+                    self.sweep_ball_collision(self.ball.change_x * self.scale, self.ball.change_y * self.scale)
+                else:
+                    self.update_ball_collision()
+
+        with section("finish"):
+            if self.started:
+                self.timer += self.tick
+            if self.started and self.collides(self.ball, FINISH):
+                self.started = False
+                self.ended = True
+        self.ticks += 1
@@ -0,0 +1,35 @@
+import time
+from csv import writer
+from datetime import datetime
+
+# Замер запуска: python main.py --startup-time. Отметки — секунды от импорта
+# этого модуля (main.py импортирует его первым). Игра сама доходит до первого
+# кадра заезда и закрывается, отметки печатаются и дописываются строкой в
+# profiles/startup.csv, чтобы было видно, когда запуск стал медленнее
+START = time.perf_counter()
+enabled = False  # Включает main() по флагу --startup-time
+MARKS = ("imports", "window", "menu", "first_frame", "assets", "level", "game_view", "game_frame")
+STARTUP_CSV = "startup.csv"
+
+marks = {}
+
+
+def mark(name: str) -> None:
+    marks.setdefault(name, time.perf_counter() - START)
+
+
+def report() -> None:
+    from profiler import PROFILE_DIR
+
+    for name in MARKS:
+        if name in marks:
+            print(f"{name:<12}{marks[name] * 1000:8.0f} мс")
+    PROFILE_DIR.mkdir(exist_ok=True)
+    path = PROFILE_DIR / STARTUP_CSV
+    new = not path.exists()
+    with open(path, "a", newline="") as f:
+        w = writer(f)
+        if new:
+            w.writerow(["date", *MARKS])
+        w.writerow([f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+                    *(round(marks[name] * 1000) if name in marks else "" for name in MARKS)])
@@ -0,0 +1,110 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from csv import writer
+from multiprocessing import Pool
+
+import simulation
+from replay import Replay, controls
+from simulation import Simulation
+
+# Перебор констант физики на записанных реплеях, все ядра через пул процессов.
+#   python sweep.py replays/*.clr -p GRAVITY=30,35,40 -p THRUST=60,70 -o sweep.csv
+# Вход реплея проигрывается как есть, поэтому с другой физикой заезд может и не
+# доехать до финиша — это тоже результат. Константы — глобальные переменные
+# simulation, у каждого процесса пула своя копия модуля, так что их можно
+# просто переписать перед прогоном
+PHYSICS = ("GRAVITY", "THRUST", "ANG_THRUST", "LIN_AIR_DRAG", "ANG_AIR_DRAG", "GROUND_FRICTION",
+           "GRAB_RADIUS", "BALL_ELASTICITY", "BALL_STOP_BOUNCE", "BALL_SLOW")
+MEDALS = ("GOLD_TIME", "SILVER_TIME")
+
+# Кэш процесса пула: реплеи и симуляции по уровню
+replays = {}
+sims = {}
+
+
+def run(task):
+    path, params = task
+    replay = replays.get(path)
+    if replay is None:
+        replay = replays[path] = Replay.load(path)
+    key = replay.level_path, replay.rate
+    sim = sims.get(key)
+    if sim is None:
+        sim = sims[key] = Simulation(replay.level_path, tick=1 / replay.rate)
+
+    for name, value in params.items():
+        setattr(simulation, name, value)
+    sim.reset()
+    bounces = 0
+    for frame in replay.frames:
+        sim.step(*controls(frame))
+        bounces += len(sim.bounces)
+        if sim.ended:
+            break
+    return path, params, sim.ended, sim.timer, sim.ticks, bounces, sim.player_hits
+
+
+def medal(finish_time: float, gold: float, silver: float) -> str:
+    if finish_time <= gold:
+        return "gold"
+    if finish_time <= silver:
+        return "silver"
+    return "bronze"
+
+
+def parse_param(text: str):
+    name, _, values = text.partition("=")
+    name = name.strip().upper()
+    if name not in PHYSICS + MEDALS:
+        raise argparse.ArgumentTypeError(f"неизвестная константа {name}, можно: {', '.join(PHYSICS + MEDALS)}")
+    return name, [float(value) for value in values.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Перебор констант физики на реплеях")
+    parser.add_argument("replays", nargs="+")
+    parser.add_argument("-p", "--param", type=parse_param, action="append", default=[],
+                        help="КОНСТАНТА=значение,значение,...")
+    parser.add_argument("-o", "--out", default="sweep.csv")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    grid = dict(args.param)
+    physics = {name: values for name, values in grid.items() if name in PHYSICS}
+    gold_times = grid.get("GOLD_TIME", [simulation.GOLD_TIME])
+    silver_times = grid.get("SILVER_TIME", [simulation.SILVER_TIME])
+
+    combos = [dict(zip(physics, values)) for values in itertools.product(*physics.values())]
+    tasks = [(path, params) for params in combos for path in args.replays]
+
+    start = time.perf_counter()
+    finish_times = {}
+    with Pool(args.workers) as pool, open(args.out, "w", newline="") as f:
+        w = writer(f)
+        w.writerow(["replay", *physics, "GOLD_TIME", "SILVER_TIME",
+                    "finished", "time", "ticks", "ball_bounces", "player_hits", "medal"])
+        for path, params, finished, finish_time, ticks, bounces, hits in pool.imap_unordered(run, tasks, chunksize=4):
+            if finished:
+                finish_times.setdefault(tuple(params.values()), []).append(finish_time)
+            # Кубки от физики не зависят — одна строка на каждую пару порогов
+            for gold, silver in itertools.product(gold_times, silver_times):
+                w.writerow([path, *params.values(), gold, silver, finished,
+                            round(finish_time, 3) if finished else "", ticks, bounces, hits,
+                            medal(finish_time, gold, silver) if finished else ""])
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(tasks)} прогонов за {elapsed:.1f} с ({args.workers} процессов) -> {args.out}")
+    # Подсказка для порогов: четверть лучших на золото, половина на серебро
+    for values, times in finish_times.items():
+        times.sort()
+        label = ", ".join(f"{name}={value}" for name, value in zip(physics, values)) or "как в игре"
+        print(f"{label}: доехали {len(times)}, "
+              f"GOLD_TIME ~ {times[len(times) // 4]:.2f}, SILVER_TIME ~ {times[len(times) // 2]:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
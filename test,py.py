@@ -1,37 +1,143 @@
+import random
 import sys
+import time
 
-vse_v_kuchu = sys.stdin.read().split()
-ukazatel = 0
+# Удар в башню gde с силой sila идёт вправо: башня ниже оставшейся силы
+# сносится в ноль и забирает единицу силы, первая не ниже — останавливает.
+# Удар, дошедший до башни p, останавливается на ней, если
+# bashni[p] >= sila - (p - gde), то есть bashni[p] + p >= gde + sila.
+# Поэтому в дереве отрезков лежит максимум bashni[p] + p, и первая
+# останавливающая башня ищется спуском по дереву за log n. Снесённые башни
+# пропускаются указателями (система непересекающихся множеств): каждая башня
+# сносится один раз, и всё вместе — O((n + q) log n) вместо O(n * q).
 
 
-def chitai_chislo():
-    global ukazatel
-    res = int(vse_v_kuchu[ukazatel])
-    ukazatel += 1
-    return res
+def chitai_chisla(potok=None):
+    # Весь ввод одним куском и в числа одним проходом
+    return list(map(int, (potok or sys.stdin.buffer).read().split()))
 
 
-n = chitai_chislo()
-bashni = []
-for i in range(n):
-    bashni.append(chitai_chislo())
+def razobrat(chisla):
+    n = chisla[0]
+    bashni = chisla[1:1 + n]
+    q = chisla[1 + n]
+    udary = list(zip(chisla[2 + n:2 + n + 2 * q:2], chisla[3 + n:3 + n + 2 * q:2]))
+    return bashni, udary
 
-q = chitai_chislo()
 
-for _ in range(q):
-    gde = chitai_chislo() - 1
-    sila = chitai_chislo()
+def reshenie_v_lob(bashni, udary):
+    # Прежний цикл: шаг за шагом, для сравнения
+    bashni = list(bashni)
+    n = len(bashni)
+    otvety = []
+    for gde, sila in udary:
+        schetchik = 0
+        shag = gde - 1
+        while sila > 0 and shag < n:
+            if bashni[shag] >= sila:
+                break
+            bashni[shag] = 0
+            sila -= 1
+            shag += 1
+            schetchik += 1
+        otvety.append(schetchik)
+    return otvety
 
-    schetchik = 0
-    shag = gde
 
-    while sila > 0 and shag < n:
-        if bashni[shag] >= sila:
-            break
+def reshenie(bashni, udary):
+    n = len(bashni)
+    razmer = 1
+    while razmer < max(n, 1):
+        razmer *= 2
+    # Листья — bashni[p] + p, за концом — -1, там никто не останавливается
+    derevo = [-1] * (2 * razmer)
+    for p, h in enumerate(bashni):
+        derevo[razmer + p] = h + p
+    for i in range(razmer - 1, 0, -1):
+        derevo[i] = max(derevo[2 * i], derevo[2 * i + 1])
 
-        bashni[shag] = 0
-        sila -= 1
-        shag += 1
-        schetchik += 1
+    # sled[p] — ближайшая не снесённая башня не левее p (n — таких нет)
+    sled = list(range(n + 1))
 
-    print(schetchik)
\ No newline at end of file
+    def nayti(p):
+        koren = p
+        while sled[koren] != koren:
+            koren = sled[koren]
+        while sled[p] != koren:
+            sled[p], p = koren, sled[p]
+        return koren
+
+    otvety = []
+    for gde, sila in udary:
+        nachalo = gde - 1
+        if nachalo >= n or sila <= 0:
+            otvety.append(0)
+            continue
+        porog = nachalo + sila
+
+        # Первая башня не левее nachalo с bashni[p] + p >= porog
+        i = razmer + nachalo
+        while True:
+            if derevo[i] >= porog:
+                while i < razmer:
+                    i = 2 * i if derevo[2 * i] >= porog else 2 * i + 1
+                stop = i - razmer
+                break
+            while i & 1:
+                i >>= 1
+            if not i:
+                stop = n
+                break
+            i += 1
+        otvety.append(stop - nachalo)
+
+        # Снести [nachalo, stop): у снесённой башни лист становится просто p
+        p = nayti(nachalo)
+        while p < stop:
+            i = razmer + p
+            derevo[i] = p
+            i >>= 1
+            while i:
+                derevo[i] = max(derevo[2 * i], derevo[2 * i + 1])
+                i >>= 1
+            sled[p] = p + 1
+            p = nayti(p + 1)
+    return otvety
+
+
+def hudshiy_sluchay(n, q, seed=0):
+    # Для старого цикла: низкие башни и удары с начала, каждый проходит весь ряд.
+    # Изредка высокая башня, чтобы удары останавливались в разных местах
+    rnd = random.Random(seed)
+    bashni = [rnd.choice((0, 1, 2)) if rnd.random() > 0.001 else n for _ in range(n)]
+    udary = [(rnd.randint(1, 3), n + rnd.randint(0, n)) for _ in range(q)]
+    stroki = [str(n), " ".join(map(str, bashni)), str(q)]
+    stroki += [f"{gde} {sila}" for gde, sila in udary]
+    return "\n".join(stroki) + "\n"
+
+
+def sravnit(n, q):
+    bashni, udary = razobrat(list(map(int, hudshiy_sluchay(n, q).split())))
+    nachalo = time.perf_counter()
+    bystro = reshenie(bashni, udary)
+    vremya_bystro = time.perf_counter() - nachalo
+    nachalo = time.perf_counter()
+    v_lob = reshenie_v_lob(bashni, udary)
+    vremya_v_lob = time.perf_counter() - nachalo
+    print(f"n={n} q={q}: дерево {vremya_bystro:.3f} с, цикл {vremya_v_lob:.3f} с, "
+          f"ответы {'совпали' if bystro == v_lob else 'РАЗНЫЕ'}")
+
+
+# python "test,py.py" < вход — ответы;
+# python "test,py.py" --gen N Q > вход — тяжёлый вход для старого цикла;
+# python "test,py.py" --bench N Q — сравнить с ним по времени
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--gen":
+        sys.stdout.write(hudshiy_sluchay(int(sys.argv[2]), int(sys.argv[3])))
+    elif len(sys.argv) == 4 and sys.argv[1] == "--bench":
+        sravnit(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        bashni, udary = razobrat(chitai_chisla())
+        otvety = reshenie(bashni, udary)
+        if otvety:
+            sys.stdout.write("\n".join(map(str, otvety)) + "\n")